@@ -0,0 +1,101 @@
+import datetime
+from sqlalchemy.exc import IntegrityError
+from model import db, ParkingSpot, ReservedSpot
+from occupancy import adjust_occupancy
+from free_spots import free_spots
+from rollups import record_closed_session
+
+# --- Spot allocation ---
+# A spot is only ever claimed with a conditional UPDATE (status 'A' -> 'O'), so two
+# workers racing for the same spot can't both win. The loser just moves on to the
+# next free spot. One active reservation per user is enforced by a partial unique
+# index on reserved_spots, not by the read-then-write check alone. Candidates come
+# from the in-memory free-spot index first; the spots table is only scanned when
+# the index runs dry, which also catches spots freed by other worker processes.
+
+class AllocationError(Exception):
+    pass
+
+class LotFullError(AllocationError):
+    pass
+
+class ActiveReservationError(AllocationError):
+    pass
+
+def _is_postgres():
+    return db.session.get_bind().dialect.name == "postgresql"
+
+def _try_claim(lot_id, spot_id):
+    # lot_id guards against a stale index: once a lot shrinks, SQLite can hand its
+    # deleted spot ids to another lot's new spots.
+    claimed = db.session.query(ParkingSpot).filter_by(id=spot_id, lot_id=lot_id, status="A").update({ParkingSpot.status: "O"}, synchronize_session=False)
+    return db.session.get(ParkingSpot, spot_id, populate_existing=True) if claimed else None
+
+def _claim_spot(lot_id):
+    """Flip the lowest-numbered free spot of a lot to occupied and return it, or None."""
+    while True:
+        candidate = free_spots.pop(lot_id)
+        if candidate is None:
+            break
+        spot = _try_claim(lot_id, candidate[1])
+        if spot:
+            return spot
+    spot = _claim_spot_from_db(lot_id)
+    # The index was stale; reload it next time round.
+    free_spots.discard(lot_id)
+    return spot
+
+def _claim_spot_from_db(lot_id):
+    if _is_postgres():
+        # Row locks let concurrent bookers skip past each other instead of queueing.
+        spot = db.session.query(ParkingSpot).filter_by(lot_id=lot_id, status="A").order_by(ParkingSpot.spot_number).with_for_update(skip_locked=True).first()
+        if spot:
+            spot.status = "O"
+        return spot
+    after = 0
+    while True:
+        candidate = db.session.query(ParkingSpot.id, ParkingSpot.spot_number).filter(ParkingSpot.lot_id == lot_id, ParkingSpot.status == "A", ParkingSpot.spot_number > after).order_by(ParkingSpot.spot_number).first()
+        if candidate is None:
+            return None
+        spot = _try_claim(lot_id, candidate.id)
+        if spot:
+            return spot
+        # Someone else got it first; keep scanning from there.
+        after = candidate.spot_number
+
+def allocate_spot(lot_id, user_id, vehicle_number):
+    """Book a spot for a user and commit. Raises LotFullError or ActiveReservationError."""
+    if db.session.query(ReservedSpot.id).filter_by(user_id=user_id, leaving_timestamp=None).first():
+        raise ActiveReservationError()
+    spot = _claim_spot(lot_id)
+    if spot is None:
+        db.session.rollback()
+        raise LotFullError()
+    reservation = ReservedSpot(spot_id=spot.id, user_id=user_id, vehicle_number=vehicle_number, parking_timestamp=datetime.datetime.now())
+    try:
+        db.session.add(reservation)
+        adjust_occupancy(lot_id, available=-1, occupied=1)
+        db.session.commit()
+    except IntegrityError:
+        # Lost a race with another booking by the same user; the spot claim rolls back too.
+        db.session.rollback()
+        free_spots.push(lot_id, spot.spot_number, spot.id)
+        raise ActiveReservationError()
+    return reservation, spot
+
+def release_spot(reservation, parking_spot, parking_lot):
+    """Close a reservation, free its spot and commit. Returns False if it was already closed."""
+    leaving = datetime.datetime.now()
+    hours = (leaving - reservation.parking_timestamp).total_seconds() / 3600
+    total_cost = round(hours * parking_lot.price_per_hour, 2)
+    closed = db.session.query(ReservedSpot).filter_by(id=reservation.id, leaving_timestamp=None).update({ReservedSpot.leaving_timestamp: leaving, ReservedSpot.total_cost: total_cost}, synchronize_session=False)
+    if not closed:
+        db.session.rollback()
+        return False
+    db.session.query(ParkingSpot).filter_by(id=parking_spot.id).update({ParkingSpot.status: "A"}, synchronize_session=False)
+    adjust_occupancy(parking_lot.id, available=1, occupied=-1)
+    record_closed_session(parking_lot.id, reservation.user_id, reservation.parking_timestamp, total_cost)
+    db.session.commit()
+    free_spots.push(parking_lot.id, parking_spot.spot_number, parking_spot.id)
+    db.session.refresh(reservation)
+    return True
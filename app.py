@@ -1,40 +1,181 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-import datetime, os
-from model import db, User, ParkingLot, ParkingSpot, ReservedSpot
+from flask import Blueprint, Flask, Response, current_app, render_template, request, redirect, stream_with_context, url_for, session, flash
+import datetime, os, click
+from sqlalchemy.orm import joinedload
+from model import db, User, ParkingLot, ParkingSpot, ReservedSpot, LotDailyRevenue, UserMonthlySpend
+from occupancy import lot_occupancy, occupancy_for, occupancy_totals, reconcile_occupancy, spot_runs
+from allocation import allocate_spot, release_spot, LotFullError, ActiveReservationError
+from free_spots import free_spots
+from provisioning import add_spots, resize_lot, ResizeError
+from migrations import upgrade
+from rollups import backfill_rollups, remove_closed_sessions
+from search import search_lots
+from cache import cache
+from metrics import metrics
+from database import database_url, engine_options, tune_sqlite
+from reservation_io import FORMATS, MIMETYPES, UnreadableFileError, export_chunks, guess_format, import_reservations, parse_date, reservation_rows
 
-app = Flask(__name__, template_folder="templates")
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///parking.sqlite3"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "supersecretkeyforvehicleparkingapp")
-db.init_app(app)
+# Views and CLI commands live on this blueprint, registered by create_app(), so
+# importing this module touches nothing; the schema is set up by `flask db-upgrade`.
+main = Blueprint("main", __name__, cli_group=None)
+
+def create_app(config=None):
+    """Build a configured app. Doesn't connect to the database or change the schema."""
+    app = Flask(__name__, template_folder="templates")
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_url()
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["DB_POOL_SIZE"] = int(os.environ.get("DB_POOL_SIZE", 10))
+    app.config["DB_MAX_OVERFLOW"] = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    app.config["DB_POOL_RECYCLE"] = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    app.config["SQLITE_BUSY_TIMEOUT_MS"] = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    app.config["HISTORY_PAGE_SIZE"] = 20
+    app.config["ADMIN_LOTS_PAGE_SIZE"] = 12
+    app.config["USER_LOTS_PAGE_SIZE"] = 10
+    app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "supersecretkeyforvehicleparkingapp")
+    app.config["CACHE_URL"] = os.environ.get("CACHE_URL")
+    app.config["CACHE_TTL"] = int(os.environ.get("CACHE_TTL", 30))
+    app.config["SLOW_QUERY_SECONDS"] = float(os.environ.get("SLOW_QUERY_SECONDS", 0.1))
+    # ?profile=1 returns a cProfile report instead of the page; keep it off in production.
+    app.config["PROFILING_ENABLED"] = os.environ.get("PROFILING") == "1"
+    app.config.update(config or {})
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
+    db.init_app(app)
+    with app.app_context():
+        tune_sqlite(db.engine, app.config["SQLITE_BUSY_TIMEOUT_MS"])
+    cache.init_app(app)
+    metrics.init_app(app)
+    app.register_blueprint(main)
+    return app
 
 # --- DB Init & Admin ---
-with app.app_context():
+
+def init_db():
+    """Create missing tables, apply pending migrations and make sure an admin exists."""
+    # Keep existing data: create what's missing, then migrate older schemas in place.
+    db.create_all()
+    for version in upgrade():
+        click.echo(f"Applied schema migration {version}.")
+
+    # If you see two admins, that's on you!
+    if not User.query.filter_by(role="admin").first():
+        admin = User(email_id="admin@parking.com", password="admin", full_name="Administrator", address="Admin Address", pin_code="000000", role="admin")
+        db.session.add(admin)
+        db.session.commit()
+        click.echo("Admin account created.")
+    else:
+        click.echo("Admin account already exists.")
+    click.echo("Database initialization complete.")
+
+@main.cli.command("db-upgrade")
+def db_upgrade_command():
+    """Create missing tables, apply schema migrations and seed the admin account."""
+    init_db()
+
+@main.cli.command("reconcile-occupancy")
+@click.option("--dry-run", is_flag=True, help="Only report drift, don't fix it.")
+def reconcile_occupancy_command(dry_run):
+    """Check lot availability counters against parking_spots and repair drift."""
+    drift = reconcile_occupancy(repair=not dry_run)
+    for d in drift:
+        click.echo(f"Lot {d['lot_id']}: stored {d['stored']} != actual {d['actual']}")
+    if not drift:
+        click.echo("All lot counters match.")
+    elif dry_run:
+        click.echo(f"{len(drift)} lot(s) drifted. Run without --dry-run to fix.")
+    else:
+        click.echo(f"Repaired {len(drift)} lot(s).")
+
+@main.cli.command("backfill-rollups")
+def backfill_rollups_command():
+    """Rebuild the revenue rollup tables from reservation history."""
+    count = backfill_rollups(db.session.connection())
+    db.session.commit()
+    click.echo(f"Rolled up {count} closed session(s).")
+
+@main.cli.command("export-reservations")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="csv", show_default=True)
+@click.option("--from", "start", type=click.DateTime(["%Y-%m-%d"]), help="First parking date to include.")
+@click.option("--to", "end", type=click.DateTime(["%Y-%m-%d"]), help="Last parking date to include.")
+@click.option("--lot-id", type=int, help="Only this lot's reservations.")
+@click.option("-o", "--output", type=click.File("w", encoding="utf-8"), default="-", help="File to write (default: stdout).")
+def export_reservations_command(fmt, start, end, lot_id, output):
+    """Stream reservations with lot, spot and user details as CSV or NDJSON."""
+    rows = reservation_rows(start.date() if start else None, end.date() if end else None, lot_id)
+    for chunk in export_chunks(rows, fmt):
+        output.write(chunk)
+
+@main.cli.command("import-reservations")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(FORMATS), help="Default: from the file extension.")
+@click.option("--dry-run", is_flag=True, help="Only validate, import nothing.")
+def import_reservations_command(path, fmt, dry_run):
+    """Bulk-import closed parking sessions (lot_id, spot_number, user_email, ...) from CSV or NDJSON."""
     try:
-        db.drop_all()
-        db.create_all()
-
-        # If you see two admins, that's on you!
-        if not User.query.filter_by(role="admin").first():
-            admin = User(email_id="admin@parking.com", password="admin", full_name="Administrator", address="Admin Address", pin_code="000000", role="admin")
-            db.session.add(admin)
-            db.session.commit()
-            print("Admin account created.")
-        else:
-            print("Admin account already exists.")
-        print("Database initialization complete.")
-    except Exception as e:
-        print("DB setup error:", e)
-
-@app.route("/")
+        with open(path, "rb") as f:
+            result = import_reservations(f, fmt or guess_format(path), dry_run=dry_run)
+    except UnreadableFileError as e:
+        raise click.ClickException(f"{path} is {e}. Fix the file and run again; sessions already stored are skipped.")
+    for e in result["errors"]:
+        click.echo(f"Line {e['line']}: {e['error']}", err=True)
+    click.echo(f"{'Would import' if dry_run else 'Imported'} {result['imported']} session(s), skipped {result['skipped']} already stored, rejected {result['rejected']}.")
+
+# --- Cached reads ---
+# Read paths served through the cache. Routes that change lots or bookings call invalidate_lot().
+
+def load_lot_page(search, page, per_page):
+    if search:
+        lots, total = search_lots(search, page=page, per_page=per_page)
+    else:
+        total = db.session.query(ParkingLot).count()
+        lots = db.session.query(ParkingLot).order_by(db.func.lower(ParkingLot.prime_location_name)).offset((page - 1) * per_page).limit(per_page).all()
+    # Plain dicts, not ORM objects, so entries outlive the session (and pickle for Redis).
+    fields = ("id", "prime_location_name", "address", "pin_code", "price_per_hour")
+    return {'lots': [{f: getattr(lot, f) for f in fields} for lot in lots], 'total': total}
+
+def cached_availability(lot_ids):
+    """{lot_id: occupancy} for the given lots, loading only the uncached ones."""
+    def load(keys):
+        counts = lot_occupancy([int(k.split(":")[1]) for k in keys])
+        return {f"availability:{lot_id}": occ for lot_id, occ in counts.items()}
+    found = cache.get_or_set_many([f"availability:{lot_id}" for lot_id in lot_ids], load)
+    return {int(k.split(":")[1]): v for k, v in found.items()}
+
+def load_summary():
+    total_lots = db.session.query(ParkingLot).count()
+    counts = lot_occupancy()
+    totals = occupancy_totals(counts)
+    total_spots = totals['total']
+    occupied_spots = totals['occupied']
+    available_spots = totals['available']
+    total_users = db.session.query(User).filter_by(role="user").count()
+    # Closed sessions come from the rollup; every open one holds exactly one occupied spot.
+    closed_sessions, total_revenue = db.session.query(db.func.sum(LotDailyRevenue.sessions), db.func.sum(LotDailyRevenue.revenue)).one()
+    total_reserved_spots = (closed_sessions or 0) + occupied_spots
+    total_revenue = total_revenue or 0.0
+    lot_occupancy_data = []
+    lots = db.session.query(ParkingLot).all()
+    for lot in lots:
+        occ = occupancy_for(counts, lot.id)
+        lot_occupancy_data.append({'name': lot.prime_location_name, 'occupied': occ['occupied'], 'total': occ['total']})
+    return dict(total_parking_lots=total_lots, total_parking_spots=total_spots, occupied_parking_spots=occupied_spots, available_parking_spots=available_spots, total_users=total_users, total_reserved_spots=total_reserved_spots, total_revenue=total_revenue, lot_occupancy_data=lot_occupancy_data)
+
+def invalidate_lot(lot_id, catalogue=False):
+    cache.invalidate(f"availability:{lot_id}", "summary")
+    if catalogue:
+        cache.invalidate_namespace("catalogue")
+
+@main.route("/")
 def home():
     return render_template("index.html")
 
-@app.route("/health")
+@main.route("/health")
 def health_check():
-    return {"status": "healthy", "message": "Yep, it's running!"}, 200
+    return {"status": "healthy", "message": "Yep, it's running!", "cache": cache.stats()}, 200
 
-@app.route("/user_register", methods=["GET", "POST"])
+@main.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@main.route("/user_register", methods=["GET", "POST"])
 def user_register():
     if request.method == "POST":
         email = request.form["email_id"]
@@ -44,15 +185,16 @@ def user_register():
         pin = request.form["pin_code"]
         if User.query.filter_by(email_id=email).first():
             flash("That email is already taken. Try logging in or use a different one.", "danger")
-            return redirect(url_for("user_register"))
+            return redirect(url_for("main.user_register"))
         user = User(email_id=email, password=pwd, full_name=name, address=addr, pin_code=pin, role="user")
         db.session.add(user)
         db.session.commit()
+        cache.invalidate("summary")
         flash("All set! Now log in and grab a spot.", "success")
-        return redirect(url_for("user_login"))
+        return redirect(url_for("main.user_login"))
     return render_template("user_register.html")
 
-@app.route("/user_login", methods=["GET", "POST"])
+@main.route("/user_login", methods=["GET", "POST"])
 def user_login():
     if request.method == "POST":
         email = request.form["email_id"]
@@ -64,12 +206,12 @@ def user_login():
             session["user_id"] = user.id
             session["user_email"] = user.email_id
             flash(f"Hey {user.full_name}, you made it!", "success")
-            return redirect(url_for("user_dashboard"))
+            return redirect(url_for("main.user_dashboard"))
         flash("Nope, that's not right. Try again!", "danger")
-        return redirect(url_for("user_login"))
+        return redirect(url_for("main.user_login"))
     return render_template("user_login.html")
 
-@app.route("/admin_login", methods=["GET", "POST"])
+@main.route("/admin_login", methods=["GET", "POST"])
 def admin_login():
     if request.method == "POST":
         email = request.form["email_id"]
@@ -80,56 +222,54 @@ def admin_login():
             session["admin_logged_in"] = True
             session["admin_id"] = admin.id
             flash("Welcome back, boss!", "success")
-            return redirect(url_for("admin_dashboard"))
+            return redirect(url_for("main.admin_dashboard"))
         flash("Nope, that's not the admin login.", "danger")
-        return redirect(url_for("admin_login"))
+        return redirect(url_for("main.admin_login"))
     return render_template("admin_login.html")
 
-@app.route("/logout")
+@main.route("/logout")
 def logout():
     session.clear()
     flash("Logged out. See you next time!", "info")
-    return redirect(url_for("home"))
+    return redirect(url_for("main.home"))
 
-@app.route("/user_dashboard")
+@main.route("/user_dashboard")
 def user_dashboard():
     if "user_logged_in" not in session:
         flash("Please log in to see your dashboard.", "danger")
-        return redirect(url_for("user_login"))
+        return redirect(url_for("main.user_login"))
     search = request.args.get('query', '').strip()
-    lots = db.session.query(ParkingLot).all()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = current_app.config["USER_LOTS_PAGE_SIZE"]
+    catalogue = cache.get_or_set(cache.key("catalogue", search.lower(), page, per_page), lambda: load_lot_page(search, page, per_page))
+    counts = cached_availability([lot['id'] for lot in catalogue['lots']])
     data = []
-    for lot in lots:
-        total = db.session.query(ParkingSpot).filter_by(lot_id=lot.id).count()
-        available = db.session.query(ParkingSpot).filter_by(lot_id=lot.id, status="A").count()
-        if not search or search.lower() in lot.prime_location_name.lower() or search.lower() in lot.address.lower() or search.lower() in lot.pin_code.lower():
-            data.append({'lot': lot, 'total_spots': total, 'available_spots': available})
-    data.sort(key=lambda x: x['lot'].prime_location_name.lower())
+    for lot in catalogue['lots']:
+        occ = occupancy_for(counts, lot['id'])
+        data.append({'lot': lot, 'total_spots': occ['total'], 'available_spots': occ['available']})
+    total = catalogue['total']
+    pages = {'page': page, 'pages': -(-total // per_page), 'total': total}
     user_id = session.get("user_id")
     chart = []
     if user_id:
-        monthly = db.session.query(
-            db.func.strftime('%Y-%m', ReservedSpot.parking_timestamp).label('month'),
-            db.func.sum(ReservedSpot.total_cost).label('total_cost')
-        ).filter(
-            ReservedSpot.user_id == user_id, ReservedSpot.total_cost.isnot(None)
-        ).group_by('month').order_by('month').all()
-        for item in monthly:
-            chart.append({'month': item.month, 'total_cost': item.total_cost})
-    return render_template("user_dashboard.html", parking_lots_data=data, parking_data_for_chart=chart, query=search)
-
-@app.route("/admin_dashboard")
+        def load_chart():
+            monthly = db.session.query(UserMonthlySpend.month, UserMonthlySpend.total_cost).filter_by(user_id=user_id).order_by(UserMonthlySpend.month).all()
+            return [{'month': item.month, 'total_cost': item.total_cost} for item in monthly]
+        chart = cache.get_or_set(f"spend:{user_id}", load_chart)
+    return render_template("user_dashboard.html", parking_lots_data=data, parking_data_for_chart=chart, query=search, pages=pages)
+
+@main.route("/admin_dashboard")
 def admin_dashboard():
     if "admin_logged_in" not in session:
         flash("Please log in to see the admin dashboard.", "danger")
-        return redirect(url_for("admin_login"))
+        return redirect(url_for("main.admin_login"))
     return render_template("admin_dashboard.html")
 
-@app.route("/admin_parking_lots", methods=["GET", "POST"])
+@main.route("/admin_parking_lots", methods=["GET", "POST"])
 def admin_parking_lots():
     if "admin_logged_in" not in session:
         flash("Please log in to see the admin dashboard.", "danger")
-        return redirect(url_for("admin_login"))
+        return redirect(url_for("main.admin_login"))
     if request.method == "POST":
         name = request.form["prime_location_name"].strip()
         rate = float(request.form["price_per_hour"])
@@ -138,39 +278,44 @@ def admin_parking_lots():
         max_spots = int(request.form["maximum_number_of_spots"])
         if not name or not addr or not pin:
             flash("Fill out all the fields, please.", "danger")
-            return redirect(url_for("admin_parking_lots"))
+            return redirect(url_for("main.admin_parking_lots"))
         if rate <= 0:
             flash("Hourly rate must be positive. No free parking here!", "danger")
-            return redirect(url_for("admin_parking_lots"))
+            return redirect(url_for("main.admin_parking_lots"))
         if max_spots < 1:
             flash("There must be at least one spot. Otherwise, what's the point?", "danger")
-            return redirect(url_for("admin_parking_lots"))
+            return redirect(url_for("main.admin_parking_lots"))
         if db.session.query(ParkingLot).filter(db.func.lower(ParkingLot.prime_location_name) == db.func.lower(name)).first():
             flash("A parking lot with this name already exists. Try another name.", "danger")
-            return redirect(url_for("admin_parking_lots"))
-        lot = ParkingLot(prime_location_name=name, price_per_hour=rate, address=addr, pin_code=pin, maximum_number_of_spots=max_spots)
+            return redirect(url_for("main.admin_parking_lots"))
+        lot = ParkingLot(prime_location_name=name, price_per_hour=rate, address=addr, pin_code=pin, maximum_number_of_spots=max_spots, available_count=max_spots, occupied_count=0)
         db.session.add(lot)
+        db.session.flush()
+        add_spots(lot.id, 1, max_spots)
         db.session.commit()
-        for i in range(1, max_spots + 1):
-            spot = ParkingSpot(lot_id=lot.id, spot_number=i, status="A")
-            db.session.add(spot)
-        db.session.commit()
+        invalidate_lot(lot.id, catalogue=True)
         flash("Parking lot added!", "success")
-        return redirect(url_for("admin_parking_lots"))
-    lots = db.session.query(ParkingLot).order_by(ParkingLot.prime_location_name).all()
+        return redirect(url_for("main.admin_parking_lots"))
+    # Only summary counts here; each lot's spot grid is fetched from admin_lot_spots when expanded.
+    page = request.args.get("page", 1, type=int)
+    pagination = db.session.query(ParkingLot).order_by(ParkingLot.prime_location_name).paginate(page=page, per_page=current_app.config["ADMIN_LOTS_PAGE_SIZE"], error_out=False)
     lot_data = []
-    for lot in lots:
-        total = db.session.query(ParkingSpot).filter_by(lot_id=lot.id).count()
-        occupied = db.session.query(ParkingSpot).filter_by(lot_id=lot.id, status="O").count()
-        spots = db.session.query(ParkingSpot).filter_by(lot_id=lot.id).order_by(ParkingSpot.spot_number).all()
-        lot_data.append({'lot': lot, 'total_spots': total, 'occupied_spots': occupied, 'spots_list': spots})
-    return render_template("admin_parking_lots.html", lot_data=lot_data)
+    for lot in pagination.items:
+        lot_data.append({'lot': lot, 'total_spots': lot.available_count + lot.occupied_count, 'occupied_spots': lot.occupied_count})
+    return render_template("admin_parking_lots.html", lot_data=lot_data, pagination=pagination)
 
-@app.route("/admin_edit_parking_lot/<int:lot_id>", methods=["GET", "POST"])
+@main.route("/admin_parking_lots/<int:lot_id>/spots")
+def admin_lot_spots(lot_id):
+    if "admin_logged_in" not in session:
+        return {"error": "Please log in as admin."}, 401
+    lot = db.session.query(ParkingLot).get_or_404(lot_id)
+    return {"lot_id": lot.id, "total": lot.available_count + lot.occupied_count, "runs": spot_runs(lot.id)}
+
+@main.route("/admin_edit_parking_lot/<int:lot_id>", methods=["GET", "POST"])
 def admin_edit_parking_lot(lot_id):
     if "admin_logged_in" not in session:
         flash("Please log in to see the admin dashboard.", "danger")
-        return redirect(url_for("admin_login"))
+        return redirect(url_for("main.admin_login"))
     lot = db.session.query(ParkingLot).get_or_404(lot_id)
     if request.method == "POST":
         name = request.form["prime_location_name"].strip()
@@ -180,153 +325,188 @@ def admin_edit_parking_lot(lot_id):
         max_spots = int(request.form["maximum_number_of_spots"])
         if not name or not addr or not pin:
             flash("Don't leave anything blank!", "danger")
-            return redirect(url_for("admin_edit_parking_lot", lot_id=lot.id))
+            return redirect(url_for("main.admin_edit_parking_lot", lot_id=lot.id))
         if rate <= 0:
             flash("Hourly rate must be positive. No free parking!", "danger")
-            return redirect(url_for("admin_edit_parking_lot", lot_id=lot.id))
+            return redirect(url_for("main.admin_edit_parking_lot", lot_id=lot.id))
         if max_spots < 1:
             flash("There must be at least one spot.", "danger")
-            return redirect(url_for("admin_edit_parking_lot", lot_id=lot.id))
+            return redirect(url_for("main.admin_edit_parking_lot", lot_id=lot.id))
         if db.session.query(ParkingLot).filter(db.func.lower(ParkingLot.prime_location_name) == db.func.lower(name), ParkingLot.id != lot_id).first():
             flash("A parking lot with this name already exists.", "danger")
-            return redirect(url_for("admin_edit_parking_lot", lot_id=lot.id))
-        current_spots = db.session.query(ParkingSpot).filter_by(lot_id=lot.id).count()
-        if max_spots < current_spots:
-            occupied = db.session.query(ParkingSpot).filter_by(lot_id=lot.id, status="O").count()
-            if max_spots < occupied:
-                flash(f"Can't reduce spots below {occupied} because some are still occupied.", "danger")
-                return redirect(url_for("admin_edit_parking_lot", lot_id=lot.id))
-            spots_to_delete = db.session.query(ParkingSpot).filter_by(lot_id=lot.id, status="A").order_by(ParkingSpot.spot_number.desc()).limit(current_spots - max_spots).all()
-            if len(spots_to_delete) < (current_spots - max_spots):
-                flash("Can't reduce spots while some of the ones to be deleted are occupied.", "danger")
-                db.session.rollback()
-                return redirect(url_for("admin_edit_parking_lot", lot_id=lot.id))
-            for spot in spots_to_delete:
-                db.session.delete(spot)
-        elif max_spots > current_spots:
-            for i in range(current_spots + 1, max_spots + 1):
-                spot = ParkingSpot(lot_id=lot.id, spot_number=i, status="A")
-                db.session.add(spot)
+            return redirect(url_for("main.admin_edit_parking_lot", lot_id=lot.id))
+        try:
+            resize_lot(lot, max_spots)
+        except ResizeError as e:
+            db.session.rollback()
+            flash(str(e), "danger")
+            return redirect(url_for("main.admin_edit_parking_lot", lot_id=lot.id))
         lot.prime_location_name = name
         lot.price_per_hour = rate
         lot.address = addr
         lot.pin_code = pin
         lot.maximum_number_of_spots = max_spots
         db.session.commit()
+        free_spots.discard(lot.id)
+        invalidate_lot(lot.id, catalogue=True)
         flash("Parking lot updated!", "success")
-        return redirect(url_for("admin_parking_lots"))
+        return redirect(url_for("main.admin_parking_lots"))
     return render_template("admin_edit_parking_lot.html", lot=lot)
 
-@app.route("/admin_delete_parking_lot/<int:lot_id>")
+@main.route("/admin_delete_parking_lot/<int:lot_id>")
 def admin_delete_parking_lot(lot_id):
     if "admin_logged_in" not in session:
         flash("Please log in to see the admin dashboard.", "danger")
-        return redirect(url_for("admin_login"))
+        return redirect(url_for("main.admin_login"))
     lot = db.session.query(ParkingLot).get_or_404(lot_id)
     if db.session.query(ParkingSpot).filter_by(lot_id=lot.id, status="O").first():
         flash("Can't delete this parking lot because it has occupied spots.", "danger")
-        return redirect(url_for("admin_parking_lots"))
+        return redirect(url_for("main.admin_parking_lots"))
+    # The cascade below deletes the lot's reservations; take them out of the rollups first.
+    remove_closed_sessions(db.session.connection(), db.select(ParkingSpot.id).where(ParkingSpot.lot_id == lot.id).scalar_subquery())
     db.session.delete(lot)
     db.session.commit()
+    free_spots.discard(lot_id)
+    invalidate_lot(lot_id, catalogue=True)
     flash("Parking lot deleted!", "success")
-    return redirect(url_for("admin_parking_lots"))
+    return redirect(url_for("main.admin_parking_lots"))
 
-@app.route("/admin_users")
+@main.route("/admin_users")
 def admin_users():
     if "admin_logged_in" not in session:
         flash("Please log in to see the admin dashboard.", "danger")
-        return redirect(url_for("admin_login"))
+        return redirect(url_for("main.admin_login"))
     users = db.session.query(User).filter_by(role="user").all()
     return render_template("admin_users.html", users=users)
 
-@app.route("/admin_summary")
+@main.route("/admin_summary")
 def admin_summary():
     if "admin_logged_in" not in session:
         flash("Please log in to see the admin dashboard.", "danger")
-        return redirect(url_for("admin_login"))
-    total_lots = db.session.query(ParkingLot).count()
-    total_spots = db.session.query(ParkingSpot).count()
-    occupied_spots = db.session.query(ParkingSpot).filter_by(status="O").count()
-    available_spots = total_spots - occupied_spots
-    total_users = db.session.query(User).filter_by(role="user").count()
-    total_reserved_spots = db.session.query(ReservedSpot).count()
-    total_revenue = db.session.query(db.func.sum(ReservedSpot.total_cost)).filter(ReservedSpot.total_cost.isnot(None)).scalar() or 0.0
-    lot_occupancy = []
-    lots = db.session.query(ParkingLot).all()
-    for lot in lots:
-        occupied = db.session.query(ParkingSpot).filter_by(lot_id=lot.id, status="O").count()
-        total = db.session.query(ParkingSpot).filter_by(lot_id=lot.id).count()
-        lot_occupancy.append({'name': lot.prime_location_name, 'occupied': occupied, 'total': total})
-    return render_template("admin_summary.html", total_parking_lots=total_lots, total_parking_spots=total_spots, occupied_parking_spots=occupied_spots, available_parking_spots=available_spots, total_users=total_users, total_reserved_spots=total_reserved_spots, total_revenue=total_revenue, lot_occupancy_data=lot_occupancy)
+        return redirect(url_for("main.admin_login"))
+    return render_template("admin_summary.html", **cache.get_or_set("summary", load_summary))
 
-@app.route("/book_parking_spot/<int:lot_id>", methods=["GET", "POST"])
+@main.route("/admin_export_reservations")
+def admin_export_reservations():
+    if "admin_logged_in" not in session:
+        flash("Please log in to see the admin dashboard.", "danger")
+        return redirect(url_for("main.admin_login"))
+    fmt = request.args.get("format", "csv")
+    if fmt not in FORMATS:
+        return {"error": f"format must be one of {', '.join(FORMATS)}."}, 400
+    try:
+        start, end = parse_date(request.args.get("from")), parse_date(request.args.get("to"))
+    except ValueError:
+        return {"error": "from and to must be dates (YYYY-MM-DD)."}, 400
+    lot_id = request.args.get("lot_id") or None
+    if lot_id is not None and not lot_id.isdigit():
+        return {"error": "lot_id must be a lot number."}, 400
+    rows = reservation_rows(start, end, int(lot_id) if lot_id else None)
+    # Streamed in chunks; stream_with_context keeps the session open until the last row is sent.
+    return Response(stream_with_context(export_chunks(rows, fmt)), mimetype=MIMETYPES[fmt], headers={"Content-Disposition": f"attachment; filename=reservations.{fmt}"})
+
+@main.route("/admin_import_reservations", methods=["POST"])
+def admin_import_reservations():
+    if "admin_logged_in" not in session:
+        return {"error": "Please log in as admin."}, 401
+    upload = request.files.get("file")
+    if not upload:
+        return {"error": "Attach the CSV or NDJSON file as 'file'."}, 400
+    fmt = request.form.get("format") or guess_format(upload.filename or "")
+    if fmt not in FORMATS:
+        return {"error": f"format must be one of {', '.join(FORMATS)}."}, 400
+    dry_run = request.form.get("dry_run") == "1"
+    try:
+        result = import_reservations(upload.stream, fmt, dry_run=dry_run)
+    except UnreadableFileError as e:
+        return {"error": f"The file is {e}. Fix it and upload again; sessions already stored are skipped."}, 400
+    if result["imported"] and not dry_run:
+        # Per-user spend charts catch up within CACHE_TTL.
+        cache.invalidate("summary")
+    return result
+
+@main.route("/book_parking_spot/<int:lot_id>", methods=["GET", "POST"])
 def book_parking_spot(lot_id):
     if "user_logged_in" not in session:
         flash("Please log in to book a parking spot.", "danger")
-        return redirect(url_for("user_login"))
+        return redirect(url_for("main.user_login"))
     parking_lot = db.session.query(ParkingLot).get_or_404(lot_id)
     if request.method == "POST":
         vehicle_number = request.form["vehicle_number"].strip().upper()
         user_id = session["user_id"]
         if not vehicle_number:
             flash("Don't forget your vehicle number!", "danger")
-            return redirect(url_for("book_parking_spot", lot_id=lot_id))
-        available_spot = db.session.query(ParkingSpot).filter_by(lot_id=lot_id, status="A").order_by(ParkingSpot.spot_number).first()
-        if not available_spot:
+            return redirect(url_for("main.book_parking_spot", lot_id=lot_id))
+        try:
+            new_reservation, available_spot = allocate_spot(lot_id, user_id, vehicle_number)
+        except LotFullError:
             flash("No spots left in this lot. Try another one!", "danger")
-            return redirect(url_for("user_dashboard"))
-        active_reservation = db.session.query(ReservedSpot).filter_by(user_id=user_id, leaving_timestamp=None).first()
-        if active_reservation:
+            return redirect(url_for("main.user_dashboard"))
+        except ActiveReservationError:
             flash("You already have a spot. Release it before booking again!", "warning")
-            return redirect(url_for("user_dashboard"))
-        new_reservation = ReservedSpot(spot_id=available_spot.id, user_id=user_id, vehicle_number=vehicle_number, parking_timestamp=datetime.datetime.now())
-        db.session.add(new_reservation)
-        available_spot.status = "O"
-        db.session.commit()
+            return redirect(url_for("main.user_dashboard"))
+        invalidate_lot(lot_id)
         flash(f"Spot {available_spot.spot_number} in {parking_lot.prime_location_name} is yours! Vehicle: {vehicle_number}", "success")
-        return redirect(url_for("user_dashboard"))
+        return redirect(url_for("main.user_dashboard"))
     return render_template("book_parking_spot.html", parking_lot=parking_lot)
 
-@app.route("/release_parking_spot/<int:reservation_id>", methods=["GET", "POST"])
+@main.route("/release_parking_spot/<int:reservation_id>", methods=["GET", "POST"])
 def release_parking_spot(reservation_id):
     if "user_logged_in" not in session:
         flash("Please log in to release your parking spot.", "danger")
-        return redirect(url_for("user_login"))
+        return redirect(url_for("main.user_login"))
     reservation = db.session.query(ReservedSpot).get_or_404(reservation_id)
     if reservation.user_id != session["user_id"]:
         flash("Nice try, but that's not your reservation!", "danger")
-        return redirect(url_for("user_dashboard"))
+        return redirect(url_for("main.user_dashboard"))
     if reservation.leaving_timestamp is not None:
         flash("This spot is already released.", "warning")
-        return redirect(url_for("user_history"))
+        return redirect(url_for("main.user_history"))
     parking_spot = db.session.query(ParkingSpot).get_or_404(reservation.spot_id)
     parking_lot = db.session.query(ParkingLot).get_or_404(parking_spot.lot_id)
     if request.method == "POST":
-        reservation.leaving_timestamp = datetime.datetime.now()
-        duration = reservation.leaving_timestamp - reservation.parking_timestamp
-        hours = duration.total_seconds() / 3600
-        total_cost = hours * parking_lot.price_per_hour
-        reservation.total_cost = round(total_cost, 2)
-        parking_spot.status = "A"
-        db.session.commit()
+        if not release_spot(reservation, parking_spot, parking_lot):
+            flash("This spot is already released.", "warning")
+            return redirect(url_for("main.user_history"))
+        invalidate_lot(parking_lot.id)
+        cache.invalidate(f"spend:{reservation.user_id}")
         flash(f"Spot {parking_spot.spot_number} released! You owe: ₹{reservation.total_cost:.2f}", "success")
-        return redirect(url_for("user_history"))
+        return redirect(url_for("main.user_history"))
     return render_template("release_parking_spot.html", reservation=reservation, parking_spot=parking_spot, parking_lot=parking_lot)
 
-@app.route("/user_history")
+@main.route("/user_history")
 def user_history():
     if "user_logged_in" not in session:
         flash("Please log in to see your parking history.", "danger")
-        return redirect(url_for("user_login"))
+        return redirect(url_for("main.user_login"))
     user_id = session["user_id"]
-    history = db.session.query(ReservedSpot).filter_by(user_id=user_id).order_by(ReservedSpot.parking_timestamp.desc()).all()
+    page_size = current_app.config["HISTORY_PAGE_SIZE"]
+    # Keyset pagination: each page starts after the (parking_timestamp, id) of the last row shown.
+    before = None
+    try:
+        before = (datetime.datetime.fromisoformat(request.args["before_ts"]), int(request.args["before_id"]))
+    except (KeyError, ValueError):
+        pass
+    q = db.session.query(ReservedSpot).options(joinedload(ReservedSpot.parking_spot).joinedload(ParkingSpot.parking_lot)).filter(ReservedSpot.user_id == user_id)
+    if before:
+        q = q.filter(db.tuple_(ReservedSpot.parking_timestamp, ReservedSpot.id) < before)
+    history = q.order_by(ReservedSpot.parking_timestamp.desc(), ReservedSpot.id.desc()).limit(page_size + 1).all()
+    next_page = None
+    if len(history) > page_size:
+        history = history[:page_size]
+        last = history[-1]
+        next_page = {'before_ts': last.parking_timestamp.isoformat(), 'before_id': last.id}
     history_data = []
     for res in history:
-        spot = db.session.query(ParkingSpot).get(res.spot_id)
-        lot = db.session.query(ParkingLot).get(spot.lot_id) if spot else None
+        spot = res.parking_spot
+        lot = spot.parking_lot if spot else None
         history_data.append({'reservation': res, 'spot': spot, 'lot': lot})
-    return render_template("user_history.html", history_data=history_data)
+    return render_template("user_history.html", history_data=history_data, next_page=next_page, is_first_page=before is None)
 
 if __name__ == "__main__":
+    # Local development: set up the database, then serve. Deployments run `flask db-upgrade` once instead.
+    app = create_app()
+    with app.app_context():
+        init_db()
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=False) 
\ No newline at end of file
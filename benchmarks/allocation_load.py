@@ -0,0 +1,132 @@
+"""Multi-process booking load test for the allocation engine.
+
+Fires parallel bookings (and releases, so users can book again) from several
+processes against one database, then checks that no spot was handed out twice,
+no user holds two open reservations and the lot counters still match the spots.
+
+    python benchmarks/allocation_load.py --workers 8 --bookings 4000
+    python benchmarks/allocation_load.py --database-url postgresql://.../parking_bench --yes-drop
+
+The seed drops and recreates every table, so a --database-url must point at a
+scratch database and needs --yes-drop to confirm it.
+"""
+import argparse, multiprocessing, os, random, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from model import db, User, ParkingLot, ParkingSpot, ReservedSpot
+from occupancy import count_occupancy, lot_occupancy
+from allocation import allocate_spot, release_spot, LotFullError, ActiveReservationError
+
+def make_app(database_url):
+    # Writers queue on SQLite's lock under load; give them longer than the app default.
+    return create_app({"SQLALCHEMY_DATABASE_URI": database_url, "SQLITE_BUSY_TIMEOUT_MS": 30000})
+
+def seed(app, lots, spots_per_lot, users):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for i in range(lots):
+            lot = ParkingLot(prime_location_name=f"Load Lot {i}", price_per_hour=20.0, address=f"{i} Test Road", pin_code="600001", maximum_number_of_spots=spots_per_lot, available_count=spots_per_lot, occupied_count=0)
+            db.session.add(lot)
+            db.session.flush()
+            db.session.add_all([ParkingSpot(lot_id=lot.id, spot_number=n, status="A") for n in range(1, spots_per_lot + 1)])
+        db.session.add_all([User(email_id=f"load{i}@example.com", password="x", full_name=f"Load {i}", address="x", pin_code="600001", role="user") for i in range(users)])
+        db.session.commit()
+        return [u.id for u in User.query.all()], [l.id for l in ParkingLot.query.all()]
+
+def worker(database_url, user_ids, lot_ids, bookings, seed_value, results):
+    app = make_app(database_url)
+    rng = random.Random(seed_value)
+    booked = full = conflicts = errors = 0
+    with app.app_context():
+        while booked < bookings:
+            user_id = rng.choice(user_ids)
+            try:
+                allocate_spot(rng.choice(lot_ids), user_id, f"KA{rng.randint(0, 9999):04d}")
+                booked += 1
+            except LotFullError:
+                full += 1
+            except ActiveReservationError:
+                conflicts += 1
+                # Free the user's spot so they can book again later.
+                active = db.session.query(ReservedSpot).filter_by(user_id=user_id, leaving_timestamp=None).first()
+                if active:
+                    spot = db.session.get(ParkingSpot, active.spot_id)
+                    release_spot(active, spot, db.session.get(ParkingLot, spot.lot_id))
+            except Exception:
+                # sqlite "database is locked" under heavy contention, etc.
+                db.session.rollback()
+                errors += 1
+    results.put((booked, full, conflicts, errors))
+
+def check(app):
+    problems = []
+    with app.app_context():
+        dup_spots = db.session.query(ReservedSpot.spot_id).filter_by(leaving_timestamp=None).group_by(ReservedSpot.spot_id).having(db.func.count() > 1).all()
+        if dup_spots:
+            problems.append(f"{len(dup_spots)} spot(s) held by more than one open reservation")
+        dup_users = db.session.query(ReservedSpot.user_id).filter_by(leaving_timestamp=None).group_by(ReservedSpot.user_id).having(db.func.count() > 1).all()
+        if dup_users:
+            problems.append(f"{len(dup_users)} user(s) with more than one open reservation")
+        open_count = db.session.query(ReservedSpot).filter_by(leaving_timestamp=None).count()
+        occupied = db.session.query(ParkingSpot).filter_by(status="O").count()
+        if open_count != occupied:
+            problems.append(f"{open_count} open reservations but {occupied} occupied spots")
+        stored, actual = lot_occupancy(), count_occupancy()
+        drifted = [lot_id for lot_id in stored if stored[lot_id]['occupied'] != actual.get(lot_id, {}).get('occupied', 0)]
+        if drifted:
+            problems.append(f"counter drift on lots {drifted}")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="scratch database to use; defaults to a throwaway SQLite file")
+    parser.add_argument("--yes-drop", action="store_true", help="confirm that every table in --database-url may be dropped")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--bookings", type=int, default=4000, help="successful bookings in total")
+    parser.add_argument("--lots", type=int, default=5)
+    parser.add_argument("--spots", type=int, default=50, help="spots per lot")
+    parser.add_argument("--users", type=int, default=400)
+    args = parser.parse_args()
+    if args.database_url and not args.yes_drop:
+        parser.error("seeding drops every table in --database-url; pass --yes-drop if it's a scratch database")
+
+    tmpdir = None
+    database_url = args.database_url
+    if not database_url:
+        tmpdir = tempfile.TemporaryDirectory()
+        database_url = "sqlite:///" + os.path.join(tmpdir.name, "load.sqlite3")
+    app = make_app(database_url)
+    user_ids, lot_ids = seed(app, args.lots, args.spots, args.users)
+
+    results = multiprocessing.Queue()
+    per_worker = args.bookings // args.workers
+    procs = [multiprocessing.Process(target=worker, args=(database_url, user_ids, lot_ids, per_worker, i, results)) for i in range(args.workers)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    totals = [0, 0, 0, 0]
+    for _ in procs:
+        for i, n in enumerate(results.get()):
+            totals[i] += n
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    booked, full, conflicts, errors = totals
+    print(f"workers={args.workers} lots={args.lots}x{args.spots} users={args.users}")
+    print(f"bookings={booked} lot_full={full} user_conflicts={conflicts} errors={errors}")
+    print(f"elapsed={elapsed:.2f}s bookings/sec={booked / elapsed:.1f}")
+    problems = check(app)
+    for problem in problems:
+        print("FAIL:", problem)
+    if tmpdir:
+        tmpdir.cleanup()
+    if problems:
+        sys.exit(1)
+    print("OK: no double allocations")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Allocation latency: free-spot index vs. the first-free-spot query.
+
+For each lot size the lot starts half full (the low-numbered half taken, which is
+the worst case for the query), then both strategies pick and claim spots:
+
+  query  SELECT ... WHERE lot_id=? AND status='A' ORDER BY spot_number LIMIT 1
+  index  FreeSpotIndex.pop() + conditional UPDATE
+
+    python benchmarks/free_spot_index.py --sizes 100 1000 10000 100000
+"""
+import argparse, os, statistics, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from model import db, ParkingLot, ParkingSpot
+from free_spots import FreeSpotIndex
+
+def seed_lot(size):
+    db.session.query(ParkingSpot).delete()
+    db.session.query(ParkingLot).delete()
+    lot = ParkingLot(prime_location_name=f"Bench {size}", price_per_hour=10.0, address="Bench Road", pin_code="600001", maximum_number_of_spots=size, available_count=size - size // 2, occupied_count=size // 2)
+    db.session.add(lot)
+    db.session.flush()
+    db.session.execute(db.insert(ParkingSpot), [{"lot_id": lot.id, "spot_number": n, "status": "O" if n <= size // 2 else "A"} for n in range(1, size + 1)])
+    db.session.commit()
+    return lot.id
+
+def claim(spot_id):
+    return db.session.query(ParkingSpot).filter_by(id=spot_id, status="A").update({ParkingSpot.status: "O"}, synchronize_session=False)
+
+def by_query(lot_id, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        spot_id = db.session.query(ParkingSpot.id).filter_by(lot_id=lot_id, status="A").order_by(ParkingSpot.spot_number).limit(1).scalar()
+        claim(spot_id)
+        timings.append(time.perf_counter() - start)
+    db.session.rollback()
+    return timings
+
+def by_index(lot_id, rounds):
+    index = FreeSpotIndex()
+    start = time.perf_counter()
+    index.pop(lot_id)
+    load = time.perf_counter() - start
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        _, spot_id = index.pop(lot_id)
+        claim(spot_id)
+        timings.append(time.perf_counter() - start)
+    db.session.rollback()
+    return load, timings
+
+def summary(timings):
+    timings = sorted(timings)
+    return statistics.mean(timings) * 1e6, timings[int(len(timings) * 0.99) - 1] * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--rounds", type=int, default=200, help="allocations per strategy per size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(tmp, "bench.sqlite3")})
+        with app.app_context():
+            db.create_all()
+            print(f"{'spots':>8} {'query mean':>11} {'query p99':>10} {'index mean':>11} {'index p99':>10} {'index load':>11}  (microseconds)")
+            for size in args.sizes:
+                lot_id = seed_lot(size)
+                rounds = min(args.rounds, size // 2 - 1)
+                q_mean, q_p99 = summary(by_query(lot_id, rounds))
+                load, timings = by_index(lot_id, rounds)
+                i_mean, i_p99 = summary(timings)
+                print(f"{size:>8} {q_mean:>11.1f} {q_p99:>10.1f} {i_mean:>11.1f} {i_p99:>10.1f} {load * 1e6:>11.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Time and peak memory for provisioning large lots: ORM-per-spot vs. bulk.
+
+  orm   one ParkingSpot object per spot, session.add() each, then db.session.delete() each
+  bulk  provisioning.add_spots() / resize_lot() (executemany inserts, set-based delete)
+
+Each size is created from scratch and then shrunk to half.
+
+    python benchmarks/provisioning.py --sizes 1000 10000 100000
+"""
+import argparse, os, sys, tempfile, time, tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from model import db, ParkingLot, ParkingSpot
+from provisioning import add_spots, resize_lot
+
+def new_lot(name, size):
+    lot = ParkingLot(prime_location_name=name, price_per_hour=10.0, address="Bench Road", pin_code="600001", maximum_number_of_spots=size, available_count=size, occupied_count=0)
+    db.session.add(lot)
+    db.session.flush()
+    return lot
+
+def orm_create(size):
+    lot = new_lot(f"orm {size}", size)
+    for i in range(1, size + 1):
+        db.session.add(ParkingSpot(lot_id=lot.id, spot_number=i, status="A"))
+    db.session.commit()
+    return lot
+
+def orm_shrink(lot, size):
+    spots = db.session.query(ParkingSpot).filter_by(lot_id=lot.id, status="A").order_by(ParkingSpot.spot_number.desc()).limit(size - size // 2).all()
+    for spot in spots:
+        db.session.delete(spot)
+    db.session.commit()
+
+def bulk_create(size):
+    lot = new_lot(f"bulk {size}", size)
+    add_spots(lot.id, 1, size)
+    db.session.commit()
+    return lot
+
+def bulk_shrink(lot, size):
+    resize_lot(lot, size // 2)
+    db.session.commit()
+
+def measure(fn, *args):
+    db.session.expunge_all()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(tmp, "bench.sqlite3")})
+        with app.app_context():
+            db.create_all()
+            print(f"{'spots':>7} {'op':>7} {'orm s':>8} {'orm MiB':>8} {'bulk s':>8} {'bulk MiB':>9}")
+            for size in args.sizes:
+                orm_lot, orm_t, orm_m = measure(orm_create, size)
+                bulk_lot, bulk_t, bulk_m = measure(bulk_create, size)
+                print(f"{size:>7} {'create':>7} {orm_t:>8.2f} {orm_m:>8.1f} {bulk_t:>8.2f} {bulk_m:>9.1f}")
+                _, orm_t, orm_m = measure(orm_shrink, db.session.merge(orm_lot), size)
+                _, bulk_t, bulk_m = measure(bulk_shrink, db.session.merge(bulk_lot), size)
+                print(f"{size:>7} {'shrink':>7} {orm_t:>8.2f} {orm_m:>8.1f} {bulk_t:>8.2f} {bulk_m:>9.1f}")
+
+if __name__ == "__main__":
+    main()
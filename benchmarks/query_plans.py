@@ -0,0 +1,156 @@
+"""Query-plan regression check for every route.
+
+Seeds a large throwaway SQLite database, drives each route through the Flask
+test client, runs EXPLAIN QUERY PLAN on every statement the route issued and
+fails if any statement does a full table scan that isn't listed in
+ALLOWED_SCANS below.
+
+    python benchmarks/query_plans.py
+    python benchmarks/query_plans.py -v      # print every plan
+
+tests/test_query_plans.py runs the same check on a smaller seed under pytest.
+"""
+import argparse, datetime, os, re, sys, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import create_app, init_db
+from model import db, User, ParkingLot, ParkingSpot, ReservedSpot
+from occupancy import reconcile_occupancy
+from rollups import backfill_rollups
+
+# Scans that a route needs by design, as (endpoint, table): e.g. a page that lists
+# every lot has to read every lot. Anything else scanning a whole table fails.
+ALLOWED_SCANS = {
+    ("main.user_dashboard", "parking_lots"): "pages through lots by name",
+    ("main.user_dashboard", "sqlite_master"): "one-off check for the FTS5 table, cached per process",
+    ("main.admin_parking_lots", "parking_lots"): "pages through lots by name",
+    ("main.admin_summary", "parking_lots"): "per-lot occupancy chart",
+    ("main.admin_summary", "lot_daily_revenue"): "revenue rollup, one row per lot per day",
+    ("main.admin_users", "users"): "lists every user",
+    ("main.admin_export_reservations", "reserved_spots"): "accounting export streams every reservation",
+    ("main.admin_export_reservations", "users"): "date-range export walks the users index and probes each user's date range",
+}
+
+LOTS, SPOTS_PER_LOT, USERS, RESERVATIONS_PER_USER = 200, 200, 2000, 25
+
+def seed(app, lots=LOTS, spots_per_lot=SPOTS_PER_LOT, users=USERS, reservations_per_user=RESERVATIONS_PER_USER):
+    with app.app_context():
+        db.session.execute(db.insert(ParkingLot), [{"id": i, "prime_location_name": f"Plan Lot {i}", "price_per_hour": 10.0, "address": f"{i} Plan Street", "pin_code": f"{600000 + i}", "maximum_number_of_spots": spots_per_lot, "available_count": spots_per_lot, "occupied_count": 0} for i in range(1, lots + 1)])
+        db.session.execute(db.insert(ParkingSpot), [{"lot_id": lot, "spot_number": n, "status": "A"} for lot in range(1, lots + 1) for n in range(1, spots_per_lot + 1)])
+        db.session.execute(db.insert(User), [{"email_id": f"plan{i}@example.com", "password": "pw", "full_name": f"Plan {i}", "address": "x", "pin_code": "600001", "role": "user"} for i in range(users)])
+        user_ids = [u for u, in db.session.query(User.id).filter_by(role="user")]
+        spot_ids = [s for s, in db.session.query(ParkingSpot.id)]
+        rows = []
+        for k, user_id in enumerate(user_ids):
+            for r in range(reservations_per_user):
+                parked = datetime.datetime(2025, 1 + r % 12, 1 + k % 28, 9)
+                left = parked + datetime.timedelta(hours=2)
+                rows.append({"spot_id": spot_ids[(k * 31 + r) % len(spot_ids)], "user_id": user_id, "vehicle_number": "KA01", "parking_timestamp": parked, "leaving_timestamp": left, "total_cost": 20.0})
+        db.session.execute(ReservedSpot.__table__.insert(), rows)
+        db.session.commit()
+        reconcile_occupancy()
+        backfill_rollups(db.session.connection())
+        db.session.execute(db.text("ANALYZE"))
+        db.session.commit()
+
+def capture(app):
+    """Record (endpoint, statement, params) for every query issued while serving a request."""
+    from flask import request, has_request_context
+    captured = []
+    with app.app_context():
+        engine = db.engine
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            captured.append((request.endpoint, statement, parameters))
+    return captured
+
+def drive(app):
+    user = app.test_client()
+    admin = app.test_client()
+    user.post("/user_login", data={"email_id": "plan7@example.com", "password": "pw"})
+    user.get("/user_dashboard")
+    user.get("/user_dashboard?page=2")
+    user.get("/user_dashboard?query=Plan Lot 12")
+    user.get("/user_dashboard?query=6001&page=2")
+    user.get("/book_parking_spot/5")
+    user.post("/book_parking_spot/5", data={"vehicle_number": "ka09"})
+    with app.app_context():
+        res_id = db.session.query(ReservedSpot.id).filter_by(user_id=db.session.query(User.id).filter_by(email_id="plan7@example.com").scalar_subquery(), leaving_timestamp=None).scalar()
+    user.get(f"/release_parking_spot/{res_id}")
+    user.post(f"/release_parking_spot/{res_id}")
+    page = user.get("/user_history").get_data(as_text=True)
+    older = re.search(r'href="(/user_history\?[^"]+)"', page)
+    user.get(older.group(1).replace("&amp;", "&"))
+    user.post("/user_register", data={"email_id": "plan7@example.com", "password": "pw", "full_name": "x", "address": "x", "pin_code": "1"})
+    admin.post("/admin_login", data={"email_id": "admin@parking.com", "password": "admin"})
+    admin.get("/admin_dashboard")
+    admin.get("/admin_parking_lots")
+    admin.get("/admin_parking_lots?page=3")
+    admin.get("/admin_parking_lots/9/spots")
+    admin.post("/admin_parking_lots", data={"prime_location_name": "Plan New", "price_per_hour": "5", "address": "x", "pin_code": "600999", "maximum_number_of_spots": "50"})
+    admin.get("/admin_edit_parking_lot/9")
+    admin.post("/admin_edit_parking_lot/9", data={"prime_location_name": "Plan Lot 9", "price_per_hour": "12", "address": "x", "pin_code": "600009", "maximum_number_of_spots": "150"})
+    admin.post("/admin_edit_parking_lot/9", data={"prime_location_name": "Plan Lot 9", "price_per_hour": "12", "address": "x", "pin_code": "600009", "maximum_number_of_spots": "250"})
+    admin.get("/admin_users")
+    admin.get("/admin_summary")
+    admin.get("/admin_export_reservations?format=csv&from=2025-03-01&to=2025-03-31")
+    admin.get("/admin_export_reservations?format=ndjson&lot_id=12")
+    admin.get("/admin_delete_parking_lot/10")
+
+# A virtual table scan with a constraint (e.g. FTS5 MATCH) is an index lookup, not a full scan.
+SCAN_RE = re.compile(r"^SCAN (\w+)\b(?! VIRTUAL TABLE INDEX \d+:\w)")
+
+def check(app, captured, verbose=False):
+    failures = []
+    seen = set()
+    with app.app_context():
+        raw = db.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            # Only stored tables count; scanning a derived table (a subquery's rows) is fine.
+            tables = {name for name, in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")} | {"sqlite_master"}
+            for endpoint, statement, params in captured:
+                if (endpoint, statement) in seen:
+                    continue
+                seen.add((endpoint, statement))
+                # Plans are computed without running anything, so UPDATE/DELETE are safe here.
+                plan = [row[3] for row in cursor.execute("EXPLAIN QUERY PLAN " + statement, params)]
+                scans = [m.group(1) for m in map(SCAN_RE.match, plan) if m]
+                bad = [t for t in scans if t in tables and (endpoint, t) not in ALLOWED_SCANS]
+                if verbose or bad:
+                    print(f"[{endpoint}] {' '.join(statement.split())[:160]}")
+                    for line in plan:
+                        print("    " + line)
+                if bad:
+                    failures.append((endpoint, bad))
+        finally:
+            raw.close()
+    return failures, len(seen)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(tmp, "plans.sqlite3"), "TESTING": True})
+        with app.app_context():
+            init_db()
+        seed(app)
+        captured = capture(app)
+        drive(app)
+        failures, checked = check(app, captured, args.verbose)
+        with app.app_context():
+            db.engine.dispose()
+    endpoints = sorted({e for e, _, _ in captured})
+    print(f"Checked {checked} distinct statements across {len(endpoints)} routes: {', '.join(endpoints)}")
+    if failures:
+        for endpoint, tables in failures:
+            print(f"FAIL: {endpoint} full-scans {', '.join(tables)}")
+        sys.exit(1)
+    print("OK: no unexpected full table scans")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Mixed-workload benchmark that drives the real Flask routes.
+
+Generates a throwaway SQLite database with N lots x M spots, K users and R
+historical reservations, then replays a weighted mix of user and admin requests
+(browse, book, release, history, admin summary) through the Flask test client.
+Reports p50/p99 latency, throughput and SQL statements per request for each
+operation, and saves the run as JSON so runs can be compared.
+
+    python benchmarks/workload.py
+    python benchmarks/workload.py --lots 500 --spots 100 --users 5000 --reservations 200000
+    python benchmarks/workload.py --mix browse=60,book=10,release=10,history=15,summary=5
+    python benchmarks/workload.py --compare benchmarks/results/workload-20251001-120000.json
+"""
+import argparse, datetime, json, os, platform, random, sqlite3, subprocess, sys, tempfile, time
+from importlib.metadata import version
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import event
+from app import create_app, init_db
+from model import db, User, ParkingLot, ParkingSpot, ReservedSpot
+from occupancy import reconcile_occupancy
+from rollups import backfill_rollups
+
+_tmp = tempfile.TemporaryDirectory()
+app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(_tmp.name, "workload.sqlite3"), "TESTING": True})
+
+DEFAULT_MIX = "browse=50,book=15,release=15,history=15,summary=5"
+INSERT_BATCH_SIZE = 10000
+
+# --- Data generator ---
+
+def _insert(model, rows):
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + INSERT_BATCH_SIZE])
+
+def generate(lots, spots, users, reservations, rng):
+    """Seed the database; returns {user_id: email} for the generated users."""
+    with app.app_context():
+        _insert(ParkingLot, [{"id": i, "prime_location_name": f"Bench Lot {i}", "price_per_hour": float(rng.choice((10, 20, 30, 50))), "address": f"{i} {rng.choice(('Park', 'Lake', 'Hill', 'Market'))} Road", "pin_code": f"{600000 + i}", "maximum_number_of_spots": spots, "available_count": spots, "occupied_count": 0} for i in range(1, lots + 1)])
+        _insert(ParkingSpot, [{"lot_id": lot, "spot_number": n, "status": "A"} for lot in range(1, lots + 1) for n in range(1, spots + 1)])
+        _insert(User, [{"email_id": f"bench{i}@example.com", "password": "pw", "full_name": f"Bench {i}", "address": "x", "pin_code": "600001", "role": "user"} for i in range(users)])
+        users = dict(db.session.query(User.id, User.email_id).filter_by(role="user"))
+        user_ids = list(users)
+        spot_ids = [s for s, in db.session.query(ParkingSpot.id)]
+        # Closed sessions spread over the last year, 1-8 hours each.
+        now = datetime.datetime.now()
+        rows = []
+        for _ in range(reservations):
+            parked = now - datetime.timedelta(minutes=rng.randint(60 * 9, 60 * 24 * 365))
+            hours = rng.randint(1, 8)
+            rows.append({"spot_id": rng.choice(spot_ids), "user_id": rng.choice(user_ids), "vehicle_number": f"KA{rng.randint(0, 9999):04d}", "parking_timestamp": parked, "leaving_timestamp": parked + datetime.timedelta(hours=hours), "total_cost": 20.0 * hours})
+        _insert(ReservedSpot, rows)
+        db.session.commit()
+        reconcile_occupancy()
+        backfill_rollups(db.session.connection())
+        db.session.execute(db.text("ANALYZE"))
+        db.session.commit()
+        return users
+
+# --- Workload ---
+
+class Driver:
+    """Simulated users and one admin, each with their own logged-in test client."""
+
+    def __init__(self, users, lots, sessions, rng):
+        self.rng = rng
+        self.lots = lots
+        self.clients = {}
+        for user_id in rng.sample(sorted(users), min(sessions, len(users))):
+            client = app.test_client()
+            client.post("/user_login", data={"email_id": users[user_id], "password": "pw"})
+            self.clients[user_id] = client
+        self.admin = app.test_client()
+        self.admin.post("/admin_login", data={"email_id": "admin@parking.com", "password": "admin"})
+        self.parked = {}
+
+    def _idle(self):
+        return [u for u in self.clients if u not in self.parked]
+
+    def browse(self):
+        user_id = self.rng.choice(list(self.clients))
+        roll = self.rng.random()
+        if roll < 0.3:
+            url = f"/user_dashboard?query=Bench Lot {self.rng.randint(1, self.lots)}"
+        elif roll < 0.5:
+            url = f"/user_dashboard?query={600000 + self.rng.randint(1, self.lots) // 10}"
+        else:
+            url = f"/user_dashboard?page={self.rng.randint(1, 5)}"
+        return user_id, lambda: self.clients[user_id].get(url)
+
+    def book(self):
+        idle = self._idle()
+        if not idle:
+            return self.release()
+        user_id = self.rng.choice(idle)
+        lot_id = self.rng.randint(1, self.lots)
+        return user_id, lambda: self.clients[user_id].post(f"/book_parking_spot/{lot_id}", data={"vehicle_number": f"ka{self.rng.randint(0, 9999):04d}"})
+
+    def release(self):
+        if not self.parked:
+            return self.book()
+        user_id = self.rng.choice(list(self.parked))
+        reservation_id = self.parked[user_id]
+        return user_id, lambda: self.clients[user_id].post(f"/release_parking_spot/{reservation_id}")
+
+    def history(self):
+        user_id = self.rng.choice(list(self.clients))
+        return user_id, lambda: self.clients[user_id].get("/user_history")
+
+    def summary(self):
+        return None, lambda: self.admin.get("/admin_summary")
+
+    def settle(self, op, user_id):
+        """Track open reservations outside the timed request so release has something to close."""
+        if op not in ("book", "release") or user_id is None:
+            return
+        with app.app_context():
+            open_id = db.session.query(ReservedSpot.id).filter_by(user_id=user_id, leaving_timestamp=None).scalar()
+        if open_id:
+            self.parked[user_id] = open_id
+        else:
+            self.parked.pop(user_id, None)
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("browse", "book", "release", "history", "summary"):
+            raise SystemExit(f"unknown operation in --mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def count_statements():
+    counter = {"on": False, "n": 0}
+    with app.app_context():
+        engine = db.engine
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if counter["on"]:
+            counter["n"] += 1
+    return counter
+
+def run(driver, mix, requests, warmup, counter):
+    ops, weights = list(mix), list(mix.values())
+    samples = {op: {"latency": [], "statements": [], "errors": 0} for op in ops}
+    elapsed = 0.0
+    for i in range(warmup + requests):
+        op = driver.rng.choices(ops, weights)[0]
+        user_id, call = getattr(driver, op)()
+        counter["n"], counter["on"] = 0, True
+        start = time.perf_counter()
+        response = call()
+        seconds = time.perf_counter() - start
+        counter["on"] = False
+        driver.settle(op, user_id)
+        if i < warmup:
+            continue
+        elapsed += seconds
+        # Fallbacks (book with nobody idle, release with nobody parked) are recorded under the op that ran.
+        ran = {"book_parking_spot": "book", "release_parking_spot": "release"}.get(response.request.path.split("/")[1], op)
+        sample = samples.setdefault(ran, {"latency": [], "statements": [], "errors": 0})
+        sample["latency"].append(seconds)
+        sample["statements"].append(counter["n"])
+        if response.status_code >= 400:
+            sample["errors"] += 1
+    return samples, elapsed
+
+# --- Report ---
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))]
+
+def summarise(samples, elapsed):
+    ops = {}
+    for op, s in sorted(samples.items()):
+        if not s["latency"]:
+            continue
+        ops[op] = {
+            "requests": len(s["latency"]),
+            "errors": s["errors"],
+            "p50_ms": round(percentile(s["latency"], 50) * 1000, 3),
+            "p99_ms": round(percentile(s["latency"], 99) * 1000, 3),
+            "mean_ms": round(sum(s["latency"]) / len(s["latency"]) * 1000, 3),
+            "statements_per_request": round(sum(s["statements"]) / len(s["statements"]), 2),
+            "max_statements": max(s["statements"]),
+        }
+    total = sum(o["requests"] for o in ops.values())
+    return {"requests": total, "seconds": round(elapsed, 3), "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0, "operations": ops}
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "flask": version("flask"), "sqlalchemy": version("sqlalchemy"), "sqlite": sqlite3.sqlite_version, "machine": platform.machine()}
+
+def print_report(result, baseline=None):
+    print(f"{'operation':<10} {'requests':>8} {'errors':>6} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'SQL/req':>8}")
+    for op, o in result["operations"].items():
+        line = f"{op:<10} {o['requests']:>8} {o['errors']:>6} {o['p50_ms']:>9.2f} {o['p99_ms']:>9.2f} {o['mean_ms']:>9.2f} {o['statements_per_request']:>8.1f}"
+        before = (baseline or {}).get("operations", {}).get(op)
+        if before:
+            line += f"   p50 {_delta(before['p50_ms'], o['p50_ms'])}  p99 {_delta(before['p99_ms'], o['p99_ms'])}  SQL {o['statements_per_request'] - before['statements_per_request']:+.1f}"
+        print(line)
+    line = f"{result['requests']} requests in {result['seconds']:.2f}s of request time: {result['throughput_rps']:.1f} req/s"
+    if baseline:
+        line += f" ({_delta(baseline['throughput_rps'], result['throughput_rps'])} vs baseline)"
+    print(line)
+
+def _delta(before, after):
+    return f"{(after - before) / before * 100:+.0f}%" if before else "n/a"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lots", type=int, default=100)
+    parser.add_argument("--spots", type=int, default=100, help="spots per lot")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--reservations", type=int, default=50000, help="historical (closed) reservations")
+    parser.add_argument("--requests", type=int, default=2000, help="timed requests")
+    parser.add_argument("--warmup", type=int, default=200, help="untimed requests run first")
+    parser.add_argument("--sessions", type=int, default=100, help="concurrently logged-in users")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights, e.g. %(default)s")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="results file (default benchmarks/results/workload-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to print deltas against")
+    args = parser.parse_args()
+
+    with app.app_context():
+        init_db()
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    start = time.perf_counter()
+    users = generate(args.lots, args.spots, args.users, args.reservations, rng)
+    print(f"Generated {args.lots} lots x {args.spots} spots, {args.users} users, {args.reservations} reservations in {time.perf_counter() - start:.1f}s")
+    driver = Driver(users, args.lots, args.sessions, rng)
+    counter = count_statements()
+    samples, elapsed = run(driver, mix, args.requests, args.warmup, counter)
+
+    result = summarise(samples, elapsed)
+    result["config"] = {k: getattr(args, k) for k in ("lots", "spots", "users", "reservations", "requests", "warmup", "sessions", "seed")}
+    result["config"]["mix"] = mix
+    result["environment"] = environment()
+    result["recorded_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"workload-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved {output}")
+
+if __name__ == "__main__":
+    main()
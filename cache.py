@@ -0,0 +1,157 @@
+import pickle, threading, time
+from collections import OrderedDict
+
+# --- Read cache ---
+# Lot catalogue pages, per-lot availability and summary figures are cached and
+# dropped by the routes that change them (book, release, lot CRUD), with a TTL
+# as a backstop. The default store is an in-process LRU. Setting CACHE_URL to
+# redis://... shares one store between workers, so an invalidation in one
+# worker is seen by all of them.
+#
+# Namespaces (e.g. every catalogue page) are invalidated by swapping the
+# namespace's generation token, so callers never have to enumerate keys.
+
+class LocalStore:
+    """Thread-safe LRU with per-entry expiry; the same interface as RedisStore."""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    continue
+                value, expires = entry
+                if expires is not None and expires <= now:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, items, ttl=None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            for key, value in items.items():
+                self._data[key] = (value, expires)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class RedisStore:
+    """Shared store for multi-worker deployments. Needs the redis package."""
+
+    def __init__(self, url, prefix="parking:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_URL points at Redis but the redis package isn't installed (pip install redis).")
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._redis.mget([self.prefix + k for k in keys])
+        return {k: pickle.loads(v) for k, v in zip(keys, values) if v is not None}
+
+    def set_many(self, items, ttl=None):
+        pipe = self._redis.pipeline()
+        for key, value in items.items():
+            pipe.set(self.prefix + key, pickle.dumps(value), ex=int(ttl) if ttl else None)
+        pipe.execute()
+
+    def delete(self, *keys):
+        if keys:
+            self._redis.delete(*[self.prefix + k for k in keys])
+
+    def clear(self):
+        for key in self._redis.scan_iter(self.prefix + "*"):
+            self._redis.delete(key)
+
+    def __len__(self):
+        return sum(1 for _ in self._redis.scan_iter(self.prefix + "*"))
+
+class Cache:
+    def __init__(self, store=None, ttl=30):
+        self.store = store or LocalStore()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        url = app.config.get("CACHE_URL")
+        if url:
+            self.store = RedisStore(url)
+        self.ttl = app.config.get("CACHE_TTL", self.ttl)
+
+    def _count(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def _generation(self, namespace):
+        gen_key = f"gen:{namespace}"
+        gen = self.store.get_many([gen_key]).get(gen_key)
+        if gen is None:
+            # A fresh token rather than a counter: if the token is evicted, old entries can't come back.
+            gen = time.time_ns()
+            self.store.set_many({gen_key: gen})
+        return gen
+
+    def key(self, namespace, *parts):
+        """A key inside a namespace; invalidate_namespace() retires all of them at once."""
+        return ":".join([namespace, str(self._generation(namespace))] + [str(p) for p in parts])
+
+    def get_or_set(self, key, load):
+        found = self.store.get_many([key])
+        if key in found:
+            self._count(1, 0)
+            return found[key]
+        self._count(0, 1)
+        value = load()
+        self.store.set_many({key: value}, ttl=self.ttl)
+        return value
+
+    def get_or_set_many(self, keys, load_missing):
+        """Look up several keys at once; load_missing(missing_keys) returns {key: value} for the rest."""
+        found = self.store.get_many(keys)
+        missing = [k for k in keys if k not in found]
+        self._count(len(keys) - len(missing), len(missing))
+        if missing:
+            loaded = load_missing(missing)
+            self.store.set_many(loaded, ttl=self.ttl)
+            found.update(loaded)
+        return found
+
+    def invalidate(self, *keys):
+        self.store.delete(*keys)
+
+    def invalidate_namespace(self, namespace):
+        self.store.set_many({f"gen:{namespace}": time.time_ns()})
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / total, 4) if total else 0.0, "entries": len(self.store)}
+
+cache = Cache()
@@ -0,0 +1,35 @@
+import os
+from sqlalchemy import event
+
+# --- Engine setup ---
+# DATABASE_URL picks the database and the engine is tuned for it. PostgreSQL
+# gets a bounded pool per worker with pre-ping, so connections dropped by a
+# server restart or idle timeout are replaced instead of failing a request.
+# SQLite gets WAL (readers don't block the writer), a busy timeout (concurrent
+# writers wait instead of failing with "database is locked") and
+# synchronous=NORMAL, which is crash-safe for the application under WAL.
+
+def database_url():
+    url = os.environ.get("DATABASE_URL", "sqlite:///parking.sqlite3")
+    # Heroku-style URLs; SQLAlchemy only accepts the postgresql:// scheme.
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+def engine_options(config):
+    url = config["SQLALCHEMY_DATABASE_URI"]
+    if url.startswith("postgresql"):
+        return {"pool_size": config["DB_POOL_SIZE"], "max_overflow": config["DB_MAX_OVERFLOW"], "pool_pre_ping": True, "pool_recycle": config["DB_POOL_RECYCLE"]}
+    return {}
+
+def tune_sqlite(engine, busy_timeout_ms):
+    """Set the SQLite pragmas on every new connection the engine opens."""
+    if engine.dialect.name != "sqlite":
+        return
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
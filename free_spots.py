@@ -0,0 +1,42 @@
+import heapq, threading
+from model import db, ParkingSpot
+
+# --- Free-spot index ---
+# Per-lot min-heap of (spot_number, spot_id) for free spots, loaded lazily from
+# parking_spots. It only suggests candidates: the database stays the source of
+# truth, and a candidate that another worker already took is simply dropped.
+
+class FreeSpotIndex:
+    def __init__(self):
+        self._heaps = {}
+        self._lock = threading.Lock()
+
+    def _load(self, lot_id):
+        # Rows come back sorted, and a sorted list is already a valid heap.
+        rows = db.session.query(ParkingSpot.spot_number, ParkingSpot.id).filter_by(lot_id=lot_id, status="A").order_by(ParkingSpot.spot_number).all()
+        heap = [(number, spot_id) for number, spot_id in rows]
+        self._heaps[lot_id] = heap
+        return heap
+
+    def pop(self, lot_id):
+        """Take the lowest-numbered free spot as (spot_number, spot_id), or None if the lot looks full."""
+        with self._lock:
+            heap = self._heaps.get(lot_id)
+            if heap is None:
+                heap = self._load(lot_id)
+            return heapq.heappop(heap) if heap else None
+
+    def push(self, lot_id, spot_number, spot_id):
+        """Return a spot to the index after a release or a rolled-back booking."""
+        with self._lock:
+            heap = self._heaps.get(lot_id)
+            # Not loaded yet: the next load will pick the spot up from the database.
+            if heap is not None:
+                heapq.heappush(heap, (spot_number, spot_id))
+
+    def discard(self, lot_id):
+        """Forget a lot so the next pop reloads it, e.g. after a resize or delete."""
+        with self._lock:
+            self._heaps.pop(lot_id, None)
+
+free_spots = FreeSpotIndex()
@@ -0,0 +1,126 @@
+import cProfile, io, logging, pstats, threading, time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from cache import cache
+
+# --- Request metrics ---
+# Per-route latency, SQL statement count and SQL time per request, gathered from
+# Flask request hooks and SQLAlchemy engine events, and rendered in Prometheus
+# text format by /metrics. Numbers are per worker process; Prometheus sums them.
+# Slow statements are logged without their bound parameters.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+log = logging.getLogger("parking.sql")
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.latency = {}
+        self.statements = {}
+        self.sql_time = {}
+        self.slow_queries = 0
+        self.slow_query_seconds = 0.1
+        self.profiling = False
+
+    def init_app(self, app):
+        self.slow_query_seconds = app.config.get("SLOW_QUERY_SECONDS", self.slow_query_seconds)
+        self.profiling = app.config.get("PROFILING_ENABLED", False)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        # Listening on the Engine class covers whichever engine the app ends up with.
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    def _start(self):
+        g.metrics_start = time.perf_counter()
+        g.sql_statements = 0
+        g.sql_seconds = 0.0
+        if self.profiling and request.args.get("profile") == "1":
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    def _finish(self, response):
+        profiler = g.pop("profiler", None)
+        if profiler:
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+            response = current_app.response_class(out.getvalue(), mimetype="text/plain")
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            self.record(request.endpoint or "unmatched", request.method, response.status_code, time.perf_counter() - start, g.sql_statements, g.sql_seconds)
+        return response
+
+    def record(self, endpoint, method, status, seconds, statements, sql_seconds):
+        with self._lock:
+            key = (endpoint, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.setdefault(endpoint, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.statements.setdefault(endpoint, Histogram(STATEMENT_BUCKETS)).observe(statements)
+            self.sql_time.setdefault(endpoint, Histogram(LATENCY_BUCKETS)).observe(sql_seconds)
+
+    def slow_query(self, statement, parameters, seconds):
+        with self._lock:
+            self.slow_queries += 1
+        count = len(parameters) if isinstance(parameters, (list, tuple, dict)) else 0
+        log.warning("slow query (%.3fs, %s) %s [%d parameter(s) redacted]", seconds, request.endpoint if has_request_context() else "-", " ".join(statement.split()), count)
+
+    def render(self):
+        lines = []
+        def histogram(name, help_text, series):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for endpoint, h in sorted(series.items()):
+                for bound, count in zip(h.buckets, h.counts):
+                    lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="+Inf"}} {h.total}')
+                lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {h.sum:.6f}')
+                lines.append(f'{name}_count{{endpoint="{endpoint}"}} {h.total}')
+        with self._lock:
+            lines.append("# HELP parking_requests_total Requests served.")
+            lines.append("# TYPE parking_requests_total counter")
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'parking_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+            histogram("parking_request_duration_seconds", "Request latency.", self.latency)
+            histogram("parking_request_sql_statements", "SQL statements per request.", self.statements)
+            histogram("parking_request_sql_seconds", "Time spent in SQL per request.", self.sql_time)
+            lines.append("# HELP parking_slow_queries_total Statements slower than the slow-query threshold.")
+            lines.append("# TYPE parking_slow_queries_total counter")
+            lines.append(f"parking_slow_queries_total {self.slow_queries}")
+        stats = cache.stats()
+        for name, kind, value in (("hits_total", "counter", stats["hits"]), ("misses_total", "counter", stats["misses"]), ("entries", "gauge", stats["entries"])):
+            lines.append(f"# TYPE parking_cache_{name} {kind}")
+            lines.append(f"parking_cache_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_start"].pop()
+    if has_request_context() and "sql_statements" in g:
+        g.sql_statements += 1
+        g.sql_seconds += seconds
+    if seconds >= metrics.slow_query_seconds:
+        metrics.slow_query(statement, parameters, seconds)
+
+metrics = Metrics()
@@ -0,0 +1,82 @@
+import datetime
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateIndex
+from model import db, User, ParkingLot, ParkingSpot, ReservedSpot, LotDailyRevenue, UserMonthlySpend
+from rollups import backfill_rollups
+from search import install_search_index
+
+# --- Schema migrations ---
+# create_all() only creates missing tables, so an existing database needs these
+# steps to pick up new columns and indexes. Each step is idempotent (it checks
+# before it changes anything) and is recorded in schema_migrations once applied.
+
+schema_migrations = db.Table(
+    "schema_migrations",
+    db.Column("version", db.Integer, primary_key=True),
+    db.Column("description", db.String(200), nullable=False),
+    db.Column("applied_at", db.DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+def _add_column(conn, table, column):
+    if column.name in {c["name"] for c in inspect(conn).get_columns(table.name)}:
+        return
+    ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"
+    if column.default is not None:
+        ddl += f" DEFAULT {column.default.arg}"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    conn.exec_driver_sql(ddl)
+
+def _create_indexes(conn, *tables):
+    for table in tables:
+        for index in table.indexes:
+            # IF NOT EXISTS rather than checkfirst: reflection can't see expression indexes.
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+@migration(1, "lot availability counters")
+def _lot_counters(conn):
+    lots = ParkingLot.__table__
+    _add_column(conn, lots, lots.c.available_count)
+    _add_column(conn, lots, lots.c.occupied_count)
+    spots = ParkingSpot.__table__
+    def count(status):
+        return db.select(db.func.count()).where(spots.c.lot_id == lots.c.id, spots.c.status == status).scalar_subquery()
+    conn.execute(lots.update().values(available_count=count("A"), occupied_count=count("O")))
+
+@migration(2, "hot-path indexes and one open reservation per user")
+def _indexes(conn):
+    _create_indexes(conn, User.__table__, ParkingLot.__table__, ParkingSpot.__table__, ReservedSpot.__table__)
+
+@migration(3, "revenue rollups")
+def _rollups(conn):
+    LotDailyRevenue.__table__.create(conn, checkfirst=True)
+    UserMonthlySpend.__table__.create(conn, checkfirst=True)
+    backfill_rollups(conn)
+
+@migration(4, "lot search index")
+def _search(conn):
+    _create_indexes(conn, ParkingLot.__table__)
+    install_search_index(conn)
+
+def upgrade():
+    """Apply pending migrations in version order; returns the versions applied."""
+    applied_now = []
+    with db.engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        done = set(conn.execute(db.select(schema_migrations.c.version)).scalars())
+    for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in done:
+            continue
+        with db.engine.begin() as conn:
+            fn(conn)
+            conn.execute(schema_migrations.insert().values(version=version, description=description, applied_at=datetime.datetime.now()))
+        applied_now.append(version)
+    return applied_now
@@ -13,6 +13,7 @@ class User(db.Model):
     pin_code = db.Column(db.String(10), nullable=False)
     role = db.Column(db.String(20), nullable=False, default="user")
     reserved_spots = db.relationship("ReservedSpot", back_populates="user", cascade="all, delete-orphan")
+    __table_args__ = (db.Index("ix_users_role", "role"),)
 
 class ParkingLot(db.Model):
     __tablename__ = "parking_lots"
@@ -22,7 +23,15 @@ class ParkingLot(db.Model):
     address = db.Column(db.String(200), nullable=False)
     pin_code = db.Column(db.String(10), nullable=False)
     maximum_number_of_spots = db.Column(db.Integer, nullable=False)
+    available_count = db.Column(db.Integer, nullable=False, default=0)
+    occupied_count = db.Column(db.Integer, nullable=False, default=0)
     parking_spots = db.relationship("ParkingSpot", backref="parking_lot", cascade="all, delete-orphan")
+    __table_args__ = (
+        # Lot names are checked for duplicates, and listed, case-insensitively.
+        db.Index("ix_parking_lots_name_lower", db.func.lower(prime_location_name)),
+        # Pin code prefix search; full-text search is set up in search.py.
+        db.Index("ix_parking_lots_pin_code", "pin_code"),
+    )
 
 class ParkingSpot(db.Model):
     __tablename__ = "parking_spots"
@@ -31,7 +40,11 @@ class ParkingSpot(db.Model):
     spot_number = db.Column(db.Integer, nullable=False)
     status = db.Column(db.String(1), nullable=False, default="A")
     reserved_spots = db.relationship("ReservedSpot", back_populates="parking_spot", cascade="all, delete-orphan")
-    __table_args__ = (db.UniqueConstraint('lot_id', 'spot_number', name='_lot_spot_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('lot_id', 'spot_number', name='_lot_spot_uc'),
+        # First free spot of a lot: WHERE lot_id=? AND status='A' ORDER BY spot_number.
+        db.Index("ix_parking_spots_lot_status_number", "lot_id", "status", "spot_number"),
+    )
 
 class ReservedSpot(db.Model):
     __tablename__ = "reserved_spots"
@@ -43,4 +56,29 @@ class ReservedSpot(db.Model):
     leaving_timestamp = db.Column(db.DateTime, nullable=True)
     total_cost = db.Column(db.Float, nullable=True)
     user = db.relationship("User", back_populates="reserved_spots")
-    parking_spot = db.relationship("ParkingSpot", back_populates="reserved_spots") 
\ No newline at end of file
+    parking_spot = db.relationship("ParkingSpot", back_populates="reserved_spots")
+    __table_args__ = (
+        # A user can hold at most one open reservation, even under concurrent bookings.
+        db.Index("uq_active_reservation_per_user", "user_id", unique=True, sqlite_where=leaving_timestamp.is_(None), postgresql_where=leaving_timestamp.is_(None)),
+        db.Index("ix_reserved_spots_user_leaving", "user_id", "leaving_timestamp"),
+        db.Index("ix_reserved_spots_user_parking", "user_id", "parking_timestamp"),
+        db.Index("ix_reserved_spots_spot", "spot_id"),
+    ) 
+
+# --- Rollups ---
+# Small pre-aggregated tables, updated as sessions close (see rollups.py), so
+# analytics pages don't have to scan reserved_spots.
+
+class LotDailyRevenue(db.Model):
+    __tablename__ = "lot_daily_revenue"
+    lot_id = db.Column(db.Integer, db.ForeignKey("parking_lots.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+
+class UserMonthlySpend(db.Model):
+    __tablename__ = "user_monthly_spend"
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    total_cost = db.Column(db.Float, nullable=False, default=0.0)
+    sessions = db.Column(db.Integer, nullable=False, default=0)
\ No newline at end of file
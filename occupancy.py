@@ -0,0 +1,76 @@
+from model import db, ParkingLot, ParkingSpot
+
+# --- Lot occupancy ---
+# Each lot carries available_count/occupied_count, kept in step with its spots
+# by adjust_occupancy() inside the same transaction that flips a spot.
+
+def lot_occupancy(lot_ids=None):
+    """Return {lot_id: {'total', 'available', 'occupied'}} from the lot counters."""
+    q = db.session.query(ParkingLot.id, ParkingLot.available_count, ParkingLot.occupied_count)
+    if lot_ids is not None:
+        lot_ids = list(lot_ids)
+        if not lot_ids:
+            return {}
+        q = q.filter(ParkingLot.id.in_(lot_ids))
+    return {lot_id: {'total': available + occupied, 'available': available, 'occupied': occupied} for lot_id, available, occupied in q}
+
+def count_occupancy(lot_ids=None):
+    """Same shape as lot_occupancy(), but counted from parking_spots in one grouped query."""
+    occupied_expr = db.func.sum(db.case((ParkingSpot.status == "O", 1), else_=0))
+    q = db.session.query(ParkingSpot.lot_id, db.func.count(ParkingSpot.id), occupied_expr).group_by(ParkingSpot.lot_id)
+    if lot_ids is not None:
+        lot_ids = list(lot_ids)
+        if not lot_ids:
+            return {}
+        q = q.filter(ParkingSpot.lot_id.in_(lot_ids))
+    counts = {}
+    for lot_id, total, occupied in q:
+        occupied = int(occupied or 0)
+        counts[lot_id] = {'total': total, 'available': total - occupied, 'occupied': occupied}
+    return counts
+
+def occupancy_for(counts, lot_id):
+    """Counts for one lot, zeros if the lot has no spots yet."""
+    return counts.get(lot_id, {'total': 0, 'available': 0, 'occupied': 0})
+
+def occupancy_totals(counts):
+    """System-wide totals summed from a lot_occupancy() result."""
+    total = sum(c['total'] for c in counts.values())
+    occupied = sum(c['occupied'] for c in counts.values())
+    return {'total': total, 'available': total - occupied, 'occupied': occupied}
+
+def adjust_occupancy(lot_id, available=0, occupied=0):
+    """Shift a lot's counters in SQL so concurrent writers don't lose updates. Caller commits."""
+    db.session.query(ParkingLot).filter_by(id=lot_id).update({
+        ParkingLot.available_count: ParkingLot.available_count + available,
+        ParkingLot.occupied_count: ParkingLot.occupied_count + occupied,
+    }, synchronize_session=False)
+
+def reconcile_occupancy(repair=True):
+    """Compare counters with the spots table; return the drifted lots and optionally fix them."""
+    actual = count_occupancy()
+    drift = []
+    for lot_id, available, occupied in db.session.query(ParkingLot.id, ParkingLot.available_count, ParkingLot.occupied_count):
+        real = occupancy_for(actual, lot_id)
+        if (available, occupied) != (real['available'], real['occupied']):
+            drift.append({'lot_id': lot_id, 'stored': {'available': available, 'occupied': occupied}, 'actual': {'available': real['available'], 'occupied': real['occupied']}})
+            if repair:
+                db.session.query(ParkingLot).filter_by(id=lot_id).update({
+                    ParkingLot.available_count: real['available'],
+                    ParkingLot.occupied_count: real['occupied'],
+                }, synchronize_session=False)
+    if repair:
+        db.session.commit()
+    return drift
+
+def spot_runs(lot_id):
+    """Run-length encode a lot's spot grid as [status, first_spot_number, length] runs."""
+    runs = []
+    for number, status in db.session.query(ParkingSpot.spot_number, ParkingSpot.status).filter_by(lot_id=lot_id).order_by(ParkingSpot.spot_number):
+        last = runs[-1] if runs else None
+        # A gap in the numbering (left by an earlier shrink) starts a new run too.
+        if last and last[0] == status and last[1] + last[2] == number:
+            last[2] += 1
+        else:
+            runs.append([status, number, 1])
+    return runs
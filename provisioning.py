@@ -0,0 +1,42 @@
+from model import db, ParkingSpot, ReservedSpot
+from occupancy import adjust_occupancy
+from rollups import remove_closed_sessions
+
+# --- Spot provisioning ---
+# Lots are grown with batched Core INSERTs (executemany) and shrunk with one
+# set-based DELETE, instead of an ORM object per spot. Nothing here commits, so
+# the caller's lot changes and the spot changes land in a single transaction.
+
+PROVISION_BATCH_SIZE = 5000
+
+class ResizeError(Exception):
+    pass
+
+def add_spots(lot_id, first_number, count):
+    """Insert `count` free spots numbered from first_number upwards."""
+    last_number = first_number + count
+    for start in range(first_number, last_number, PROVISION_BATCH_SIZE):
+        stop = min(start + PROVISION_BATCH_SIZE, last_number)
+        db.session.execute(db.insert(ParkingSpot), [{"lot_id": lot_id, "spot_number": n, "status": "A"} for n in range(start, stop)])
+
+def resize_lot(lot, max_spots):
+    """Grow or shrink a lot's spots to max_spots. Raises ResizeError if occupied spots are in the way."""
+    current_spots, highest = db.session.query(db.func.count(ParkingSpot.id), db.func.max(ParkingSpot.spot_number)).filter_by(lot_id=lot.id).one()
+    if max_spots > current_spots:
+        add_spots(lot.id, (highest or 0) + 1, max_spots - current_spots)
+        adjust_occupancy(lot.id, available=max_spots - current_spots)
+    elif max_spots < current_spots:
+        occupied = db.session.query(ParkingSpot).filter_by(lot_id=lot.id, status="O").count()
+        if max_spots < occupied:
+            raise ResizeError(f"Can't reduce spots below {occupied} because some are still occupied.")
+        surplus = current_spots - max_spots
+        # The highest-numbered `surplus` free spots go.
+        cutoff = db.session.query(ParkingSpot.spot_number).filter_by(lot_id=lot.id, status="A").order_by(ParkingSpot.spot_number.desc()).offset(surplus - 1).limit(1).scalar()
+        if cutoff is None:
+            raise ResizeError("Can't reduce spots while some of the ones to be deleted are occupied.")
+        doomed = db.session.query(ParkingSpot.id).filter(ParkingSpot.lot_id == lot.id, ParkingSpot.status == "A", ParkingSpot.spot_number >= cutoff)
+        # Same cascade the ORM did one spot at a time: the spots' past reservations go with them.
+        remove_closed_sessions(db.session.connection(), doomed.scalar_subquery())
+        db.session.query(ReservedSpot).filter(ReservedSpot.spot_id.in_(doomed.scalar_subquery())).delete(synchronize_session=False)
+        deleted = db.session.query(ParkingSpot).filter(ParkingSpot.id.in_(doomed.scalar_subquery())).delete(synchronize_session=False)
+        adjust_occupancy(lot.id, available=-deleted)
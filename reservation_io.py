@@ -0,0 +1,200 @@
+import csv, datetime, io, json
+from model import db, User, ParkingLot, ParkingSpot, ReservedSpot
+from rollups import record_closed_sessions
+
+# --- Reservation export / import ---
+# Exports read reservations through a server-side cursor (yield_per) and are
+# serialised in chunks, so memory stays flat however long the history is.
+# Imports take the same columns, a batch at a time: each batch's lots/spots and
+# users are looked up in one query apiece, the valid rows go in with one
+# executemany, and the revenue rollups are updated in the same transaction.
+# Only closed sessions can be imported; they don't touch spot status. A row that
+# matches a stored session (same spot, user and parking time) is skipped, so an
+# import that stopped partway can simply be run again.
+
+class UnreadableFileError(Exception):
+    pass
+
+EXPORT_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+FORMATS = ("csv", "ndjson")
+MIMETYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# Spreadsheets run a cell starting with one of these as a formula. CSV exports
+# prefix such values with ' (shown as text), and CSV imports strip it again.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+EXPORT_FIELDS = ("reservation_id", "lot_id", "lot_name", "lot_address", "lot_pin_code", "spot_id", "spot_number", "user_id", "user_email", "vehicle_number", "parking_timestamp", "leaving_timestamp", "total_cost")
+
+def parse_date(text):
+    """A YYYY-MM-DD string as a date; None for blank. Raises ValueError otherwise."""
+    return datetime.date.fromisoformat(text) if text else None
+
+def guess_format(filename):
+    return "ndjson" if filename.lower().endswith((".ndjson", ".jsonl", ".json")) else "csv"
+
+def reservation_rows(start=None, end=None, lot_id=None):
+    """Yield each reservation as a dict of EXPORT_FIELDS, parked between start and end (dates, inclusive)."""
+    query = (
+        db.select(ReservedSpot.id, ParkingLot.id, ParkingLot.prime_location_name, ParkingLot.address, ParkingLot.pin_code, ParkingSpot.id, ParkingSpot.spot_number, User.id, User.email_id, ReservedSpot.vehicle_number, ReservedSpot.parking_timestamp, ReservedSpot.leaving_timestamp, ReservedSpot.total_cost)
+        .join(ParkingSpot, ParkingSpot.id == ReservedSpot.spot_id)
+        .join(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+        .join(User, User.id == ReservedSpot.user_id)
+        .order_by(ReservedSpot.id)
+    )
+    if start:
+        query = query.where(ReservedSpot.parking_timestamp >= datetime.datetime.combine(start, datetime.time.min))
+    if end:
+        query = query.where(ReservedSpot.parking_timestamp < datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min))
+    if lot_id is not None:
+        query = query.where(ParkingSpot.lot_id == lot_id)
+    for row in db.session.execute(query, execution_options={"yield_per": EXPORT_BATCH_SIZE}):
+        yield dict(zip(EXPORT_FIELDS, row))
+
+def _escape_formula(value):
+    return "'" + value if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+
+def _unescape_formula(value):
+    return value[1:] if isinstance(value, str) and value.startswith("'") and value[1:].startswith(FORMULA_PREFIXES) else value
+
+def export_chunks(rows, fmt):
+    """Serialise rows as CSV or NDJSON text, EXPORT_BATCH_SIZE rows per chunk."""
+    buf = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buf, EXPORT_FIELDS)
+        writer.writeheader()
+    for n, row in enumerate(rows, 1):
+        row = {k: v.isoformat() if isinstance(v, datetime.datetime) else v for k, v in row.items()}
+        if writer:
+            writer.writerow({k: _escape_formula(v) for k, v in row.items()})
+        else:
+            buf.write(json.dumps(row) + "\n")
+        if n % EXPORT_BATCH_SIZE == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+def read_records(stream, fmt):
+    """Yield (line number, record dict) from a CSV or NDJSON text stream; record is None if unreadable."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, {k: _unescape_formula(v) for k, v in record.items()}
+        return
+    for n, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield n, record if isinstance(record, dict) else None
+
+def _field(record, name, convert=str, required=True):
+    value = record.get(name)
+    value = "" if value is None else str(value).strip()
+    if not value:
+        if required:
+            raise ValueError(f"{name} is required")
+        return None
+    try:
+        return convert(value)
+    except ValueError:
+        raise ValueError(f"{name} {value!r} is not valid")
+
+def _parse(record):
+    if record is None:
+        raise ValueError("not a readable record")
+    parked = _field(record, "parking_timestamp", datetime.datetime.fromisoformat)
+    leaving = _field(record, "leaving_timestamp", datetime.datetime.fromisoformat)
+    if parked.tzinfo or leaving.tzinfo:
+        raise ValueError("timestamps must be local time without a UTC offset")
+    if leaving < parked:
+        raise ValueError("leaving_timestamp is before parking_timestamp")
+    vehicle = _field(record, "vehicle_number").upper()
+    if len(vehicle) > 20:
+        raise ValueError("vehicle_number is longer than 20 characters")
+    cost = _field(record, "total_cost", float, required=False)
+    if cost is not None and cost < 0:
+        raise ValueError("total_cost is negative")
+    return {"lot_id": _field(record, "lot_id", int), "spot_number": _field(record, "spot_number", int), "user_email": _field(record, "user_email"), "vehicle_number": vehicle, "parking_timestamp": parked, "leaving_timestamp": leaving, "total_cost": cost}
+
+def _import_batch(batch, result, dry_run):
+    keys = {(r["lot_id"], r["spot_number"]) for _, r in batch}
+    spots = {(lot_id, number): (spot_id, price) for spot_id, lot_id, number, price in db.session.execute(
+        db.select(ParkingSpot.id, ParkingSpot.lot_id, ParkingSpot.spot_number, ParkingLot.price_per_hour)
+        .join(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+        .where(db.tuple_(ParkingSpot.lot_id, ParkingSpot.spot_number).in_(keys)))}
+    users = dict(db.session.execute(db.select(User.email_id, User.id).where(User.email_id.in_({r["user_email"] for _, r in batch}))).all())
+    candidates = [(spots[k][0], users[r["user_email"]], r["parking_timestamp"]) for _, r in batch if (k := (r["lot_id"], r["spot_number"])) in spots and r["user_email"] in users]
+    # Served by ix_reserved_spots_user_parking.
+    seen = set(db.session.execute(
+        db.select(ReservedSpot.spot_id, ReservedSpot.user_id, ReservedSpot.parking_timestamp)
+        .where(db.tuple_(ReservedSpot.spot_id, ReservedSpot.user_id, ReservedSpot.parking_timestamp).in_(candidates))).all()) if candidates else set()
+    rows, sessions = [], []
+    for line, r in batch:
+        spot = spots.get((r["lot_id"], r["spot_number"]))
+        user_id = users.get(r["user_email"])
+        if spot is None:
+            _reject(result, line, f"lot {r['lot_id']} has no spot {r['spot_number']}")
+            continue
+        if user_id is None:
+            _reject(result, line, f"no user with email {r['user_email']}")
+            continue
+        spot_id, price = spot
+        key = (spot_id, user_id, r["parking_timestamp"])
+        if key in seen:
+            result["skipped"] += 1
+            continue
+        seen.add(key)
+        cost = r["total_cost"]
+        if cost is None:
+            # Priced the way release_spot() prices a session.
+            cost = round((r["leaving_timestamp"] - r["parking_timestamp"]).total_seconds() / 3600 * price, 2)
+        rows.append({"spot_id": spot_id, "user_id": user_id, "vehicle_number": r["vehicle_number"], "parking_timestamp": r["parking_timestamp"], "leaving_timestamp": r["leaving_timestamp"], "total_cost": cost})
+        sessions.append((r["lot_id"], user_id, r["parking_timestamp"], cost))
+    if rows and not dry_run:
+        db.session.execute(db.insert(ReservedSpot), rows)
+        record_closed_sessions(db.session.connection(), sessions)
+        db.session.commit()
+    result["imported"] += len(rows)
+
+def _reject(result, line, message):
+    result["rejected"] += 1
+    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+        result["errors"].append({"line": line, "error": message})
+
+def import_reservations(stream, fmt, dry_run=False):
+    """Import closed sessions from a binary CSV or NDJSON stream in batches.
+
+    Rows that fail validation are rejected and reported; rows already stored
+    (or repeated in the file) are skipped. Each batch of valid rows commits on
+    its own. With dry_run nothing is written. Returns {"imported", "skipped",
+    "rejected", "errors"} (the first MAX_REPORTED_ERRORS errors). Raises
+    UnreadableFileError if the file isn't UTF-8 or isn't valid CSV; batches
+    committed before that point stay, and a re-run skips them.
+    """
+    result = {"imported": 0, "skipped": 0, "rejected": 0, "errors": []}
+    batch = []
+    # utf-8-sig: Excel starts its CSVs with a byte-order mark.
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        for line, record in read_records(text, fmt):
+            try:
+                batch.append((line, _parse(record)))
+            except ValueError as e:
+                _reject(result, line, str(e))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                _import_batch(batch, result, dry_run)
+                batch = []
+    except (UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        raise UnreadableFileError(f"not readable as UTF-8 {fmt.upper()}: {e}")
+    if batch:
+        _import_batch(batch, result, dry_run)
+    result["errors"].sort(key=lambda e: e["line"])
+    return result
@@ -0,0 +1,85 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from model import db, ParkingSpot, ReservedSpot, LotDailyRevenue, UserMonthlySpend
+
+# --- Revenue rollups ---
+# Daily revenue/sessions per lot and monthly spend per user, both keyed on the
+# session's parking_timestamp (the same month the old chart grouped by).
+# release_spot() adds each closed session, anything that deletes reservation
+# history subtracts it with remove_closed_sessions(), and backfill_rollups()
+# rebuilds both tables from reserved_spots.
+
+BACKFILL_BATCH_SIZE = 1000
+
+def _month(ts):
+    return ts.strftime("%Y-%m")
+
+def _add(conn, model, keys, total_col, amount, sessions=1):
+    table = model.__table__
+    row = dict(keys, sessions=sessions, **{total_col: amount})
+    increments = {"sessions": table.c.sessions + sessions, total_col: table.c[total_col] + amount}
+    dialect = {"sqlite": sqlite, "postgresql": postgresql}.get(conn.dialect.name)
+    if dialect:
+        stmt = dialect.insert(table).values(**row)
+        conn.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=increments))
+        return
+    where = [table.c[k] == v for k, v in keys.items()]
+    if not conn.execute(table.update().where(*where).values(**increments)).rowcount:
+        conn.execute(table.insert().values(**row))
+
+def record_closed_session(lot_id, user_id, parking_timestamp, total_cost):
+    """Add one closed session to both rollups. Runs in the caller's transaction."""
+    conn = db.session.connection()
+    _add(conn, LotDailyRevenue, {"lot_id": lot_id, "day": parking_timestamp.date()}, "revenue", total_cost)
+    _add(conn, UserMonthlySpend, {"user_id": user_id, "month": _month(parking_timestamp)}, "total_cost", total_cost)
+
+def _aggregate(sessions):
+    """Sum (lot_id, user_id, parking_timestamp, total_cost) sessions per (lot, day) and per (user, month)."""
+    daily, monthly = {}, {}
+    for lot_id, user_id, parked, cost in sessions:
+        for bucket, key in ((daily, (lot_id, parked.date())), (monthly, (user_id, _month(parked)))):
+            total, count = bucket.get(key, (0.0, 0))
+            bucket[key] = (total + cost, count + 1)
+    return daily, monthly
+
+def _apply(conn, sessions, sign):
+    daily, monthly = _aggregate(sessions)
+    for (lot_id, day), (total, count) in daily.items():
+        _add(conn, LotDailyRevenue, {"lot_id": lot_id, "day": day}, "revenue", sign * total, sign * count)
+    for (user_id, month), (total, count) in monthly.items():
+        _add(conn, UserMonthlySpend, {"user_id": user_id, "month": month}, "total_cost", sign * total, sign * count)
+    return {lot_id for lot_id, _ in daily}, {user_id for user_id, _ in monthly}
+
+def record_closed_sessions(conn, sessions):
+    """Add many (lot_id, user_id, parking_timestamp, total_cost) sessions, one upsert per rollup row."""
+    _apply(conn, sessions, 1)
+
+def remove_closed_sessions(conn, spot_ids):
+    """Subtract the closed sessions on spot_ids (a subquery) from both rollups. Call before deleting them."""
+    rows = conn.execution_options(yield_per=BACKFILL_BATCH_SIZE).execute(
+        db.select(ParkingSpot.lot_id, ReservedSpot.user_id, ReservedSpot.parking_timestamp, ReservedSpot.total_cost)
+        .join(ParkingSpot, ParkingSpot.id == ReservedSpot.spot_id)
+        .where(ReservedSpot.spot_id.in_(spot_ids), ReservedSpot.total_cost.isnot(None))
+    )
+    lot_ids, user_ids = _apply(conn, rows, -1)
+    # Drop emptied rows, as backfill_rollups() would never have written them.
+    if lot_ids:
+        conn.execute(LotDailyRevenue.__table__.delete().where(LotDailyRevenue.lot_id.in_(lot_ids), LotDailyRevenue.sessions <= 0))
+    if user_ids:
+        conn.execute(UserMonthlySpend.__table__.delete().where(UserMonthlySpend.user_id.in_(user_ids), UserMonthlySpend.sessions <= 0))
+
+def backfill_rollups(conn):
+    """Rebuild both rollups from every closed reservation. Returns the number of sessions read."""
+    rows = conn.execution_options(yield_per=BACKFILL_BATCH_SIZE).execute(
+        db.select(ParkingSpot.lot_id, ReservedSpot.user_id, ReservedSpot.parking_timestamp, ReservedSpot.total_cost)
+        .join(ParkingSpot, ParkingSpot.id == ReservedSpot.spot_id)
+        .where(ReservedSpot.total_cost.isnot(None))
+    )
+    daily, monthly = _aggregate(rows)
+    count = sum(n for _, n in daily.values())
+    conn.execute(LotDailyRevenue.__table__.delete())
+    conn.execute(UserMonthlySpend.__table__.delete())
+    if daily:
+        conn.execute(LotDailyRevenue.__table__.insert(), [{"lot_id": l, "day": d, "revenue": t, "sessions": n} for (l, d), (t, n) in daily.items()])
+    if monthly:
+        conn.execute(UserMonthlySpend.__table__.insert(), [{"user_id": u, "month": m, "total_cost": t, "sessions": n} for (u, m), (t, n) in monthly.items()])
+    return count
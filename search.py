@@ -0,0 +1,108 @@
+import re
+from sqlalchemy.exc import OperationalError
+from model import db, ParkingLot
+
+# --- Lot search ---
+# Name/address/pin code search runs in the database: an FTS5 table on SQLite, a
+# GIN tsvector index on PostgreSQL, and a plain index on pin_code for prefix
+# lookups. Pin code prefix hits rank first, then text hits by relevance.
+# Anything else falls back to a LIKE scan. Ranking, the page slice and the
+# match count all run in SQL, so only one page of lots is ever loaded.
+
+SEARCH_FIELDS = "prime_location_name || ' ' || address || ' ' || pin_code"
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS parking_lots_fts USING fts5(prime_location_name, address, pin_code, content='parking_lots', content_rowid='id', prefix='2 3')",
+    """CREATE TRIGGER IF NOT EXISTS parking_lots_fts_ai AFTER INSERT ON parking_lots BEGIN
+        INSERT INTO parking_lots_fts(rowid, prime_location_name, address, pin_code) VALUES (new.id, new.prime_location_name, new.address, new.pin_code);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS parking_lots_fts_ad AFTER DELETE ON parking_lots BEGIN
+        INSERT INTO parking_lots_fts(parking_lots_fts, rowid, prime_location_name, address, pin_code) VALUES ('delete', old.id, old.prime_location_name, old.address, old.pin_code);
+    END""",
+    # Only the searchable columns: counter updates on every booking shouldn't touch the index.
+    """CREATE TRIGGER IF NOT EXISTS parking_lots_fts_au AFTER UPDATE OF prime_location_name, address, pin_code ON parking_lots BEGIN
+        INSERT INTO parking_lots_fts(parking_lots_fts, rowid, prime_location_name, address, pin_code) VALUES ('delete', old.id, old.prime_location_name, old.address, old.pin_code);
+        INSERT INTO parking_lots_fts(rowid, prime_location_name, address, pin_code) VALUES (new.id, new.prime_location_name, new.address, new.pin_code);
+    END""",
+    "INSERT INTO parking_lots_fts(parking_lots_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_parking_lots_search ON parking_lots USING gin (to_tsvector('simple', {SEARCH_FIELDS}))",
+]
+
+def install_search_index(conn):
+    """Create the full-text index for this database, if it has one. Returns True if installed."""
+    ddl = {"sqlite": SQLITE_DDL, "postgresql": POSTGRES_DDL}.get(conn.dialect.name)
+    if not ddl:
+        return False
+    try:
+        for statement in ddl:
+            conn.exec_driver_sql(statement)
+    except OperationalError:
+        # SQLite built without FTS5; search_lots() falls back to LIKE.
+        return False
+    return True
+
+def _terms(query):
+    return re.findall(r"\w+", query.lower())
+
+_fts_available = {}
+
+def _has_fts():
+    bind = db.session.get_bind()
+    if bind.dialect.name != "sqlite":
+        return False
+    key = str(bind.url)
+    if key not in _fts_available:
+        _fts_available[key] = db.session.execute(db.text("SELECT 1 FROM sqlite_master WHERE name = 'parking_lots_fts'")).first() is not None
+    return _fts_available[key]
+
+# Each hit is (id, grp, pin, score): pin code prefix hits are grp 0 and rank
+# by pin code; text hits are grp 1 and rank by score, lowest first.
+
+def _pin_hits(query):
+    if not query.isdigit():
+        return None
+    # A range on the pin_code index; LIKE 'x%' can't use it under SQLite's default collation.
+    upper = query[:-1] + chr(ord(query[-1]) + 1)
+    return db.select(ParkingLot.id.label("id"), db.literal_column("0").label("grp"), ParkingLot.pin_code.label("pin"), db.null().label("score")).where(ParkingLot.pin_code >= query, ParkingLot.pin_code < upper)
+
+def _text_hits(terms):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        # Spelled exactly as in ix_parking_lots_search so the GIN index is used.
+        tsv = db.literal_column(f"to_tsvector('simple', {SEARCH_FIELDS})")
+        tsq = db.func.to_tsquery(db.literal_column("'simple'"), " & ".join(f"{t}:*" for t in terms))
+        return db.select(ParkingLot.id.label("id"), db.literal_column("1").label("grp"), db.null().label("pin"), (-db.func.ts_rank(tsv, tsq)).label("score")).where(tsv.op("@@")(tsq))
+    if _has_fts():
+        # rank is FTS5's bm25 as a column; bm25() itself can't be called once this is a subquery.
+        fts = db.table("parking_lots_fts", db.column("rowid"), db.column("rank"))
+        match = db.text("parking_lots_fts MATCH :q").bindparams(q=" AND ".join(f'"{t}"*' for t in terms))
+        return db.select(fts.c.rowid.label("id"), db.literal_column("1").label("grp"), db.null().label("pin"), fts.c.rank.label("score")).select_from(fts).where(match)
+    like = db.and_(*[db.or_(ParkingLot.prime_location_name.ilike(f"%{t}%"), ParkingLot.address.ilike(f"%{t}%"), ParkingLot.pin_code.ilike(f"%{t}%")) for t in terms])
+    return db.select(ParkingLot.id.label("id"), db.literal_column("1").label("grp"), db.null().label("pin"), ParkingLot.prime_location_name.label("score")).where(like)
+
+def search_lots(query, page=1, per_page=10):
+    """Ranked, paginated lots matching query. Returns (lots on this page, total matches)."""
+    terms = _terms(query)
+    if not terms:
+        return [], 0
+    pin_hits, text_hits = _pin_hits(query.strip()), _text_hits(terms)
+    if pin_hits is None:
+        ranked = text_hits.subquery("ranked")
+    else:
+        # A lot that is both a pin and a text hit ranks as a pin hit.
+        hits = db.union_all(pin_hits, text_hits).subquery("hits")
+        ranked = db.select(hits.c.id, db.func.min(hits.c.grp).label("grp"), db.func.min(hits.c.pin).label("pin"), db.func.min(hits.c.score).label("score")).group_by(hits.c.id).subquery("ranked")
+    # Rank and slice on ids alone; every row also carries the match count.
+    rows = db.session.execute(
+        db.select(ranked.c.id, db.func.count().over())
+        .order_by(ranked.c.grp, ranked.c.pin, db.case((ranked.c.grp == 1, ranked.c.score)), ranked.c.id)
+        .offset((page - 1) * per_page).limit(per_page)
+    ).all()
+    if not rows:
+        # Past the last page: count separately.
+        return [], db.session.query(db.func.count()).select_from(ranked).scalar()
+    lots = {lot.id: lot for lot in db.session.query(ParkingLot).filter(ParkingLot.id.in_([lot_id for lot_id, _ in rows]))}
+    return [lots[lot_id] for lot_id, _ in rows if lot_id in lots], rows[0][1]
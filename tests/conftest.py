@@ -0,0 +1,34 @@
+import os, sys
+
+# The app is a flat set of modules at the repo root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from app import create_app, init_db
+from cache import cache
+from free_spots import free_spots
+from model import db, User, LotDailyRevenue, UserMonthlySpend
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'parking.sqlite3'}", "TESTING": True})
+    with app.app_context():
+        init_db()
+        db.session.add(User(email_id="driver@example.com", password="pw", full_name="Driver", address="x", pin_code="600001", role="user"))
+        db.session.commit()
+    yield app
+    # Both are per process, so clear them between databases.
+    cache.store.clear()
+    free_spots._heaps.clear()
+    with app.app_context():
+        db.engine.dispose()
+
+@pytest.fixture
+def rollup_rows(app):
+    """Reads both rollup tables in key order, amounts rounded to the paisa."""
+    def read():
+        with app.app_context():
+            daily = db.session.query(LotDailyRevenue.lot_id, LotDailyRevenue.day, LotDailyRevenue.revenue, LotDailyRevenue.sessions).order_by(LotDailyRevenue.lot_id, LotDailyRevenue.day)
+            monthly = db.session.query(UserMonthlySpend.user_id, UserMonthlySpend.month, UserMonthlySpend.total_cost, UserMonthlySpend.sessions).order_by(UserMonthlySpend.user_id, UserMonthlySpend.month)
+            return [(k, d, round(t, 2), n) for k, d, t, n in daily], [(k, m, round(t, 2), n) for k, m, t, n in monthly]
+    return read
@@ -0,0 +1,108 @@
+"""Booking and releasing spots: conditional claims, one active reservation per user."""
+import datetime
+import pytest
+from sqlalchemy.exc import IntegrityError
+from allocation import allocate_spot, release_spot, ActiveReservationError, LotFullError
+from free_spots import free_spots
+from model import db, User, ParkingLot, ParkingSpot, ReservedSpot
+from provisioning import add_spots, resize_lot
+
+def add_lot(name, spots):
+    lot = ParkingLot(prime_location_name=name, price_per_hour=10.0, address="1 Test Road", pin_code="600001", maximum_number_of_spots=spots, available_count=spots, occupied_count=0)
+    db.session.add(lot)
+    db.session.flush()
+    add_spots(lot.id, 1, spots)
+    db.session.commit()
+    return lot
+
+def add_user(email):
+    user = User(email_id=email, password="pw", full_name="Driver", address="x", pin_code="600001", role="user")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def counters(lot_id):
+    lot = db.session.get(ParkingLot, lot_id, populate_existing=True)
+    return lot.available_count, lot.occupied_count
+
+def spot_statuses(lot_id):
+    return dict(db.session.query(ParkingSpot.spot_number, ParkingSpot.status).filter_by(lot_id=lot_id).execution_options(populate_existing=True))
+
+def test_second_booking_by_the_same_user_is_refused(app):
+    with app.app_context():
+        lot = add_lot("Lot A", 3)
+        user = add_user("user@example.com")
+        allocate_spot(lot.id, user.id, "KA01")
+        with pytest.raises(ActiveReservationError):
+            allocate_spot(lot.id, user.id, "KA02")
+        assert spot_statuses(lot.id) == {1: "O", 2: "A", 3: "A"}
+        assert counters(lot.id) == (2, 1)
+        assert db.session.query(ReservedSpot).filter_by(user_id=user.id).count() == 1
+
+def test_database_allows_one_active_reservation_per_user(app):
+    with app.app_context():
+        lot = add_lot("Lot A", 2)
+        user = add_user("user@example.com")
+        spot_ids = [spot_id for spot_id, in db.session.query(ParkingSpot.id).filter_by(lot_id=lot.id)]
+        # What a booking that raced past allocate_spot()'s check would write.
+        db.session.add_all(ReservedSpot(spot_id=spot_id, user_id=user.id, vehicle_number="KA01", parking_timestamp=datetime.datetime.now()) for spot_id in spot_ids)
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+
+def test_full_lot_raises(app):
+    with app.app_context():
+        lot = add_lot("Lot A", 2)
+        first, second, third = (add_user(f"user{i}@example.com") for i in range(3))
+        allocate_spot(lot.id, first.id, "KA01")
+        allocate_spot(lot.id, second.id, "KA02")
+        with pytest.raises(LotFullError):
+            allocate_spot(lot.id, third.id, "KA03")
+        assert counters(lot.id) == (0, 2)
+
+def test_taken_spot_is_never_claimed_twice(app):
+    with app.app_context():
+        lot = add_lot("Lot A", 3)
+        first, second = add_user("user0@example.com"), add_user("user1@example.com")
+        _, taken = allocate_spot(lot.id, first.id, "KA01")
+        # A stale index offers the occupied spot again; the conditional UPDATE turns it down.
+        free_spots.push(lot.id, taken.spot_number, taken.id)
+        _, spot = allocate_spot(lot.id, second.id, "KA02")
+        assert spot.spot_number == 2
+        assert spot_statuses(lot.id) == {1: "O", 2: "O", 3: "A"}
+        assert counters(lot.id) == (1, 2)
+
+def test_second_release_changes_nothing(app, rollup_rows):
+    with app.app_context():
+        lot = add_lot("Lot A", 2)
+        user = add_user("user@example.com")
+        reservation, spot = allocate_spot(lot.id, user.id, "KA01")
+        assert release_spot(reservation, spot, lot)
+        left = reservation.leaving_timestamp
+        assert release_spot(reservation, spot, lot) is False
+        assert counters(lot.id) == (2, 0)
+        assert spot_statuses(lot.id) == {1: "A", 2: "A"}
+        assert db.session.get(ReservedSpot, reservation.id, populate_existing=True).leaving_timestamp == left
+    daily, monthly = rollup_rows()
+    assert [sessions for *_, sessions in daily] == [1]
+
+def test_stale_index_never_claims_another_lots_spot(app):
+    with app.app_context():
+        a = add_lot("Lot A", 4)
+        first, second, third = (add_user(f"user{i}@example.com") for i in range(3))
+        # Loads lot A's index: spots 3 and 4 are still in it after these two bookings.
+        allocate_spot(a.id, first.id, "KA01")
+        allocate_spot(a.id, second.id, "KA02")
+        doomed = {spot_id for spot_id, in db.session.query(ParkingSpot.id).filter(ParkingSpot.lot_id == a.id, ParkingSpot.spot_number > 2)}
+        # Another worker shrinks A (this process's index isn't told) and creates B,
+        # whose spots reuse the ids A just gave up.
+        resize_lot(a, 2)
+        a.maximum_number_of_spots = 2
+        db.session.commit()
+        b = add_lot("Lot B", 2)
+        reused = {spot_id for spot_id, in db.session.query(ParkingSpot.id).filter_by(lot_id=b.id)}
+        assert reused & doomed
+        with pytest.raises(LotFullError):
+            allocate_spot(a.id, third.id, "KA03")
+        assert db.session.query(ParkingSpot).filter_by(lot_id=b.id, status="A").count() == 2
+        assert counters(a.id) == (0, 2)
+        assert counters(b.id) == (2, 0)
@@ -0,0 +1,48 @@
+"""Lot occupancy reads must cost the same number of queries however many lots exist."""
+import pytest
+from sqlalchemy import event
+from cache import cache
+from model import db, ParkingLot, ParkingSpot
+
+LOTS = 15
+SPOTS_PER_LOT = 4
+
+def add_lots(app, count):
+    with app.app_context():
+        first = (db.session.query(db.func.max(ParkingLot.id)).scalar() or 0) + 1
+        ids = range(first, first + count)
+        db.session.execute(db.insert(ParkingLot), [{"id": i, "prime_location_name": f"Lot {i}", "price_per_hour": 10.0, "address": f"{i} Test Road", "pin_code": f"{600000 + i}", "maximum_number_of_spots": SPOTS_PER_LOT, "available_count": SPOTS_PER_LOT - 1, "occupied_count": 1} for i in ids])
+        db.session.execute(db.insert(ParkingSpot), [{"lot_id": i, "spot_number": n, "status": "O" if n == 1 else "A"} for i in ids for n in range(1, SPOTS_PER_LOT + 1)])
+        db.session.commit()
+
+def count_statements(app, client, url):
+    """Statements issued while serving url, with a cold cache so every read reaches the database."""
+    cache.store.clear()
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    return len(statements)
+
+@pytest.mark.parametrize("url, login", [
+    ("/user_dashboard", ("/user_login", "driver@example.com", "pw")),
+    ("/admin_parking_lots", ("/admin_login", "admin@parking.com", "admin")),
+    ("/admin_summary", ("/admin_login", "admin@parking.com", "admin")),
+])
+def test_query_count_does_not_grow_with_lots(app, url, login):
+    client = app.test_client()
+    login_url, email, password = login
+    client.post(login_url, data={"email_id": email, "password": password})
+    add_lots(app, LOTS)
+    client.get(url)
+    few = count_statements(app, client, url)
+    add_lots(app, LOTS * 9)
+    many = count_statements(app, client, url)
+    assert few == many, f"{url}: {few} statements with {LOTS} lots, {many} with {LOTS * 10}"
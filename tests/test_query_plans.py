@@ -0,0 +1,12 @@
+"""No route may full-scan a table that benchmarks/query_plans.py doesn't allow."""
+from benchmarks.query_plans import capture, check, drive, seed
+
+def test_routes_use_indexes(app):
+    # Large enough for ANALYZE to steer the planner the way the full-size seed does,
+    # and for drive() to shrink lot 9 from 200 spots to 150.
+    seed(app, lots=40, spots_per_lot=200, users=300, reservations_per_user=25)
+    captured = capture(app)
+    drive(app)
+    failures, checked = check(app, captured)
+    assert checked > 50
+    assert not failures, "unexpected full table scans: " + "; ".join(f"{endpoint}: {', '.join(tables)}" for endpoint, tables in failures)
@@ -0,0 +1,96 @@
+"""Reservation export and import through the admin routes."""
+import csv, datetime, io
+import pytest
+from model import db, User, ParkingLot, ParkingSpot, ReservedSpot
+from provisioning import add_spots
+from reservation_io import read_records
+from rollups import backfill_rollups
+
+START = datetime.datetime(2025, 1, 6, 9)
+
+@pytest.fixture
+def admin(app):
+    client = app.test_client()
+    client.post("/admin_login", data={"email_id": "admin@parking.com", "password": "admin"})
+    return client
+
+def seed_history(app, lots=2, sessions=3, vehicle_number="KA01AB1234"):
+    """Closed sessions on each of `lots` new lots, with the rollups built from them."""
+    with app.app_context():
+        user_id = db.session.query(User.id).filter_by(email_id="driver@example.com").scalar()
+        for n in range(lots):
+            lot = ParkingLot(prime_location_name=f"Lot {n}", price_per_hour=10.0, address="1 Test Road", pin_code="600001", maximum_number_of_spots=2, available_count=2, occupied_count=0)
+            db.session.add(lot)
+            db.session.flush()
+            add_spots(lot.id, 1, 2)
+            spot_id = db.session.query(ParkingSpot.id).filter_by(lot_id=lot.id, spot_number=1).scalar()
+            for i in range(sessions):
+                parked = START + datetime.timedelta(days=i, hours=n)
+                db.session.add(ReservedSpot(spot_id=spot_id, user_id=user_id, vehicle_number=vehicle_number, parking_timestamp=parked, leaving_timestamp=parked + datetime.timedelta(hours=2), total_cost=20.0))
+        backfill_rollups(db.session.connection())
+        db.session.commit()
+
+def test_export_filters_by_lot(app, admin):
+    seed_history(app)
+    body = admin.get("/admin_export_reservations?format=ndjson&lot_id=1").get_data(as_text=True)
+    assert len(body.splitlines()) == 3
+    assert all('"lot_id": 1,' in line for line in body.splitlines())
+
+@pytest.mark.parametrize("query", ["lot_id=1x", "lot_id=-1", "from=2025-13-01", "format=xml"])
+def test_export_rejects_bad_parameters(app, admin, query):
+    seed_history(app)
+    response = admin.get(f"/admin_export_reservations?{query}")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+FORMULA = '=HYPERLINK("http://example.com","x")'
+
+def test_csv_export_neutralises_formulas(app, admin):
+    seed_history(app, lots=1, sessions=1, vehicle_number=FORMULA)
+    body = admin.get("/admin_export_reservations?format=csv").get_data(as_text=True)
+    (row,) = csv.DictReader(io.StringIO(body))
+    assert row["vehicle_number"] == "'" + FORMULA
+    # NDJSON isn't opened in spreadsheets and keeps the value as stored.
+    assert FORMULA.replace('"', '\\"') in admin.get("/admin_export_reservations?format=ndjson").get_data(as_text=True)
+    # A CSV import reads it back unescaped.
+    ((_, record),) = read_records(io.StringIO(body, newline=""), "csv")
+    assert record["vehicle_number"] == FORMULA
+
+def upload(client, data, filename="sessions.csv"):
+    return client.post("/admin_import_reservations", data={"file": (io.BytesIO(data), filename)})
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+def test_reimporting_an_export_changes_nothing(app, admin, rollup_rows, fmt):
+    seed_history(app)
+    before = rollup_rows()
+    export = admin.get(f"/admin_export_reservations?format={fmt}").get_data()
+    response = upload(admin, export, f"sessions.{fmt}")
+    assert response.status_code == 200
+    assert response.get_json() == {"imported": 0, "skipped": 6, "rejected": 0, "errors": []}
+    assert rollup_rows() == before
+    with app.app_context():
+        assert db.session.query(ReservedSpot).count() == 6
+
+def test_import_reads_a_csv_with_a_byte_order_mark(app, admin, rollup_rows):
+    seed_history(app, lots=1, sessions=0)
+    text = "lot_id,spot_number,user_email,vehicle_number,parking_timestamp,leaving_timestamp,total_cost\r\n1,2,driver@example.com,KA01AB1234,2025-01-06T09:00:00,2025-01-06T11:00:00,\r\n"
+    response = upload(admin, text.encode("utf-8-sig"))
+    assert response.get_json() == {"imported": 1, "skipped": 0, "rejected": 0, "errors": []}
+    daily, monthly = rollup_rows()
+    assert [(lot_id, revenue, sessions) for lot_id, _, revenue, sessions in daily] == [(1, 20.0, 1)]
+
+def test_import_rejects_a_file_that_is_not_utf8(app, admin):
+    seed_history(app, lots=1, sessions=0)
+    text = "lot_id,spot_number,user_email,vehicle_number,parking_timestamp,leaving_timestamp,total_cost\r\n1,2,driver@example.com,KA01 \u00e9,2025-01-06T09:00:00,2025-01-06T11:00:00,\r\n"
+    response = upload(admin, text.encode("latin-1"))
+    assert response.status_code == 400
+    assert "UTF-8" in response.get_json()["error"]
+    with app.app_context():
+        assert db.session.query(ReservedSpot).count() == 0
+
+def test_import_command_rejects_a_file_that_is_not_utf8(app, tmp_path):
+    path = tmp_path / "sessions.csv"
+    path.write_bytes("lot_id,vehicle_number\r\n1,KA01 \u00e9\r\n".encode("latin-1"))
+    result = app.test_cli_runner().invoke(args=["import-reservations", str(path)])
+    assert result.exit_code == 1
+    assert "not readable as UTF-8 CSV" in result.output
@@ -0,0 +1,47 @@
+"""The revenue rollups stay equal to a rebuild from reservation history."""
+import datetime
+from allocation import allocate_spot, release_spot
+from model import db, User, ParkingLot, ParkingSpot
+from provisioning import add_spots
+from rollups import backfill_rollups
+
+def edit_form(lot, max_spots):
+    return {"prime_location_name": lot.prime_location_name, "price_per_hour": str(lot.price_per_hour), "address": lot.address, "pin_code": lot.pin_code, "maximum_number_of_spots": str(max_spots)}
+
+def test_rollups_match_a_backfill_after_shrinking_and_deleting_lots(app, rollup_rows):
+    with app.app_context():
+        lots = []
+        for n in range(3):
+            lot = ParkingLot(prime_location_name=f"Lot {n}", price_per_hour=10.0 + n, address="1 Test Road", pin_code="600001", maximum_number_of_spots=4, available_count=4, occupied_count=0)
+            db.session.add(lot)
+            db.session.flush()
+            add_spots(lot.id, 1, 4)
+            lots.append(lot)
+        db.session.add_all(User(email_id=f"user{i}@example.com", password="pw", full_name="Driver", address="x", pin_code="600001", role="user") for i in range(3))
+        db.session.commit()
+        user_ids = [user_id for user_id, in db.session.query(User.id).filter_by(role="user")]
+        # Sessions over several days and months on spots 1-3 of every lot.
+        for day in (0, 1, 40):
+            for lot in lots:
+                booked = [allocate_spot(lot.id, user_id, "KA01AB1234") for user_id in user_ids]
+                for hours, (reservation, spot) in enumerate(booked, 1):
+                    reservation.parking_timestamp = datetime.datetime.now() - datetime.timedelta(days=day, hours=hours)
+                    db.session.commit()
+                    assert release_spot(reservation, spot, lot)
+        shrunk, deleted = lots[0], lots[1]
+        shrink_form, delete_id = edit_form(shrunk, 1), deleted.id
+
+    admin = app.test_client()
+    admin.post("/admin_login", data={"email_id": "admin@parking.com", "password": "admin"})
+    admin.post(f"/admin_edit_parking_lot/{shrunk.id}", data=shrink_form)
+    admin.get(f"/admin_delete_parking_lot/{delete_id}")
+    with app.app_context():
+        assert db.session.query(ParkingSpot).filter_by(lot_id=shrunk.id).count() == 1
+        assert db.session.get(ParkingLot, delete_id) is None
+
+    kept = rollup_rows()
+    assert kept[0] and kept[1]
+    with app.app_context():
+        backfill_rollups(db.session.connection())
+        db.session.commit()
+    assert kept == rollup_rows()